@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_isb import add_mock_arguments, mock_from_arguments
+from scraper.concurrency import percentile
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Scraper settings per variant; every variant crawls the same plates against the same mock
+VARIANTS = {
+    "browser-cold": {"backend": "browser", "warm_pages": False, "adaptive": False},
+    "browser-warm": {"backend": "browser", "warm_pages": True, "adaptive": False},
+    "browser-adaptive": {"backend": "browser", "warm_pages": True, "adaptive": True},
+    "http": {"backend": "http", "adaptive": False},
+}
+
+
+def run_variant(name, url, plates, concurrency, workdir, results):
+    """Crawls ``plates`` plates with one scraper variant; runs in its own process."""
+    os.chdir(workdir)  # Keeps logs/, output/ and stats.json out of the repository
+    from logger.logger import start_logging
+    from main import InsuranceScraper
+
+    start_logging()  # Logging is part of what a crawl costs
+
+    class BenchmarkScraper(InsuranceScraper):
+        def pending_indices(self, start=0):
+            return itertools.islice(super().pending_indices(start), plates)
+
+        async def scrape_index(self, index, page):
+            started = time.monotonic()
+            try:
+                await super().scrape_index(index, page)
+            finally:
+                latencies.append(time.monotonic() - started)
+
+    latencies = []
+    scraper = BenchmarkScraper(
+        output_file=os.path.join("output", "data.json"),
+        concurrency=concurrency,
+        regions=["10"],
+        url=url,
+        metrics_port=None,
+        **VARIANTS[name],
+    )
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.monotonic()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(scraper.run())
+    elapsed = time.monotonic() - started
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)  # Browser processes
+
+    results.put({
+        "variant": name,
+        "plates": len(latencies),
+        "seconds": round(elapsed, 2),
+        "plates_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "cpu_seconds": round(
+            cpu_after.ru_utime + cpu_after.ru_stime - cpu_before.ru_utime - cpu_before.ru_stime
+            + children.ru_utime + children.ru_stime, 2
+        ),
+        "max_rss_mb": round(max(cpu_after.ru_maxrss, children.ru_maxrss) / 1024, 1),  # ru_maxrss is KiB on Linux
+        "outcomes": dict(scraper.metrics.outcomes),
+    })
+
+
+def benchmark(variants, url, plates, concurrency):
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for name in variants:
+        results = context.Queue()
+        with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+            process = context.Process(target=run_variant, args=(name, url, plates, concurrency, workdir, results))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                print(f"{name}: failed with exit code {process.exitcode}")
+                continue
+            reports.append(results.get())
+        report = reports[-1]
+        print(
+            f"{name:<18} {report['plates_per_sec']:>8} plates/s  p50 {report['p50']:>6}s  p99 {report['p99']:>6}s"
+            f"  cpu {report['cpu_seconds']:>6}s  rss {report['max_rss_mb']:>7} MB  {report['outcomes']}"
+        )
+    return reports
+
+
+def regressions(reports, baseline, threshold):
+    """Lists variants whose throughput dropped or p99 grew by more than ``threshold``."""
+    found = []
+    for report in reports:
+        before = baseline.get(report["variant"])
+        if before is None:
+            continue
+        if report["plates_per_sec"] < before["plates_per_sec"] * (1 - threshold):
+            found.append(f"{report['variant']}: {before['plates_per_sec']} -> {report['plates_per_sec']} plates/s")
+        if report["p99"] > before["p99"] * (1 + threshold):
+            found.append(f"{report['variant']}: p99 {before['p99']}s -> {report['p99']}s")
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark InsuranceScraper variants against the local mock ISB.")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--plates", type=int, default=500, help="plates per variant")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--output", help="write the reports to this JSON file")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE_FILE, help="compare against a saved baseline")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_FILE, help="save the reports as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = mock_from_arguments(args)
+    url = mock.start()
+    try:
+        reports = benchmark(args.variants, url, args.plates, args.concurrency)
+    finally:
+        mock.stop()
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({report["variant"]: report for report in reports}, f, indent=4, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(reports, json.load(f), args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import html
+import itertools
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FORM_PATH = "/cmtpl/checkValidity"
+BUTTON_NAME = "ctl00$pageBody$btnCheck"
+
+ORGANIZATIONS = [
+    '"QALA SIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+    '"PAŞA SIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+    '"MEGA SIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+    '"ATƏŞGAH SIĞORTA ŞİRKƏTİ" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+    '"AZƏRSIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+]
+CARS = {
+    "TOYOTA": ["PRİUS", "CAMRY", "COROLLA", "LAND CRUİSER"],
+    "HYUNDAI": ["ELANTRA", "SONATA", "ACCENT", "TUCSON"],
+    "MERCEDES-BENZ": ["E 200", "C 180", "SPRİNTER"],
+    "LADA (VAZ)": ["2107", "PRİORA", "GRANTA"],
+    "KIA": ["RİO", "SPORTAGE", "OPTİMA"],
+    "CHEVROLET": ["COBALT", "CRUZE", "LACETTİ"],
+}
+STATUSES = ["Qüvvədədir", "Qüvvədədir", "Qüvvədədir", "Müddəti bitib"]
+
+PAGE = """<!DOCTYPE html>
+<html lang="az">
+<head>
+<meta charset="utf-8">
+<title>İcbari Sığorta Bürosu - Yoxlama</title>
+<link rel="stylesheet" href="/static/site.css">
+<script src="/static/site.js"></script>
+</head>
+<body>
+<img src="/static/logo.png" alt="ISB">
+<form method="post" action="{action}" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}">
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="C2EE9ABB">
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{validation}">
+<input type="text" name="carNumber" id="carNumber" value="{plate}">
+<input type="submit" name="{button}" value="Yoxla" id="pageBody_btnCheck">
+{body}
+</form>
+</body>
+</html>"""
+ERROR_DIV = '<div id="divError" class="alert alert-danger">Məlumat tapılmadı</div>'
+HIDDEN_ERROR_DIV = '<div id="divError" class="alert alert-danger" style="display:none"></div>'
+RESULT_TABLE = (
+    '<div class="result-area"><table class="table"><thead><tr><th>Təşkilat</th>'
+    "<th>Dövlət qeydiyyat nömrəsi</th><th>Marka</th><th>Model</th><th>Status</th></tr></thead>"
+    "<tbody>{rows}</tbody></table></div>"
+)
+STATIC = {
+    "/static/site.css": ("text/css", b"body{font-family:'Isb',sans-serif}" + b" " * 40_000),
+    "/static/site.js": ("application/javascript", b"window.isb = {};"),
+    "/static/logo.png": ("image/png", b"\x89PNG\r\n\x1a\n" + b"\0" * 60_000),
+}
+
+
+def parse_latency(spec):
+    """Turns "fixed:S", "uniform:LO:HI" or "lognormal:MEDIAN:SIGMA" (seconds) into a sampler."""
+    kind, *args = spec.split(":")
+    args = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class SyntheticDataset:
+    """Deterministic plate -> outcome mapping, so repeated runs see the same data."""
+
+    def __init__(self, density=0.3, no_data_rate=0.01, multi_policy_rate=0.02, seed=0):
+        self.density = density
+        self.no_data_rate = no_data_rate
+        self.multi_policy_rate = multi_policy_rate
+        self.seed = seed
+
+    def _draw(self, plate_number, salt):
+        digest = hashlib.blake2b(f"{self.seed}:{salt}:{plate_number}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64
+
+    def lookup(self, plate_number):
+        """Returns a list of policy rows, [] for "No Data", or None for "Məlumat tapılmadı"."""
+        u = self._draw(plate_number, "outcome")
+        if u >= self.density + self.no_data_rate:
+            return None
+        if u >= self.density:
+            return []
+        count = 2 if self._draw(plate_number, "policies") < self.multi_policy_rate else 1
+        rows = []
+        for i in range(count):
+            brand = sorted(CARS)[int(self._draw(plate_number, f"brand{i}") * len(CARS))]
+            models = CARS[brand]
+            rows.append([
+                ORGANIZATIONS[int(self._draw(plate_number, f"org{i}") * len(ORGANIZATIONS))],
+                plate_number,
+                brand,
+                models[int(self._draw(plate_number, f"model{i}") * len(models))],
+                STATUSES[int(self._draw(plate_number, f"status{i}") * len(STATUSES))],
+            ])
+        return rows
+
+
+class MockISB:
+    """Local stand-in for the checkValidity page with injectable latency, errors and hangs."""
+
+    def __init__(self, dataset=None, latency="fixed:0", error_rate=0.0, timeout_rate=0.0,
+                 hang_seconds=30.0, state_ttl=1800.0):
+        self.dataset = dataset or SyntheticDataset()
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.state_ttl = state_ttl
+        self.tokens = OrderedDict()  # __VIEWSTATE -> issue time, oldest first; expired ones are dropped
+        self.requests = 0
+        self.lookups = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def issue_token(self):
+        token = hashlib.sha1(f"vs{next(self._counter)}".encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            self.tokens[token] = now
+            while now - next(iter(self.tokens.values())) >= self.state_ttl:
+                self.tokens.popitem(last=False)
+        return token
+
+    def token_valid(self, token):
+        with self._lock:
+            issued = self.tokens.get(token)
+        return issued is not None and time.monotonic() - issued < self.state_ttl
+
+    def count_request(self, lookup=False):
+        """Counts a request (from any handler thread); ``lookup`` marks a form postback."""
+        with self._lock:
+            self.requests += 1
+            self.lookups += lookup
+
+    def render(self, plate_number="", body=HIDDEN_ERROR_DIV):
+        return PAGE.format(
+            action=FORM_PATH,
+            viewstate=self.issue_token(),
+            validation=hashlib.sha1(b"ev").hexdigest(),
+            plate=html.escape(plate_number),
+            button=BUTTON_NAME,
+            body=body,
+        )
+
+    def render_result(self, plate_number):
+        rows = self.dataset.lookup(plate_number)
+        if rows is None:
+            return self.render(plate_number, ERROR_DIV)
+        cells = "".join(
+            "<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>" for row in rows
+        ) or '<tr><td colspan="5">Məlumat yoxdur</td></tr>'
+        return self.render(plate_number, HIDDEN_ERROR_DIV + RESULT_TABLE.format(rows=cells))
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send(self, status, content_type, payload, cookie=False):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                if cookie:
+                    self.send_header("Set-Cookie", "ASP.NET_SessionId=mock; path=/; HttpOnly")
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # The client gave up on a hung request
+
+            def do_GET(self):
+                mock.count_request()
+                path = urlsplit(self.path).path
+                if path in STATIC:
+                    content_type, payload = STATIC[path]
+                    return self.send(200, content_type, payload)
+                if path != FORM_PATH:
+                    return self.send(404, "text/plain", b"Not Found")
+                time.sleep(mock.latency() / 2)
+                self.send(200, "text/html; charset=utf-8", mock.render().encode(), cookie=True)
+
+            def do_POST(self):
+                mock.count_request(lookup=True)
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if urlsplit(self.path).path != FORM_PATH:
+                    return self.send(404, "text/plain", b"Not Found")
+                if not mock.token_valid(form.get("__VIEWSTATE", [""])[0]) or BUTTON_NAME not in form:
+                    return self.send(500, "text/html", b"<h1>Validation of viewstate MAC failed.</h1>")
+                roll = random.random()
+                if roll < mock.timeout_rate:
+                    time.sleep(mock.hang_seconds)
+                time.sleep(mock.latency())
+                if mock.timeout_rate <= roll < mock.timeout_rate + mock.error_rate:
+                    return self.send(500, "text/html", b"<h1>Server Error in '/' Application.</h1>")
+                plate_number = form.get("carNumber", [""])[0].strip().upper()
+                self.send(200, "text/html; charset=utf-8", mock.render_result(plate_number).encode())
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serves on a background thread; returns the form URL."""
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}{FORM_PATH}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency", default="lognormal:0.15:0.5", help="fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of lookups answered with HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of lookups that hang")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--density", type=float, default=0.3, help="fraction of plates with a policy")
+    parser.add_argument("--state-ttl", type=float, default=1800.0, help="seconds a __VIEWSTATE stays valid")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def mock_from_arguments(args):
+    return MockISB(
+        SyntheticDataset(density=args.density, seed=args.seed),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        state_ttl=args.state_ttl,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for services.isb.az/cmtpl/checkValidity.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    url = mock_from_arguments(args).start(args.host, args.port)
+    print(f"Mock ISB serving {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
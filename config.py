@@ -1,2 +1,122 @@
 TARGET_URL="https://services.isb.az/cmtpl/checkValidity"
-OUTPUT_FILE="output/data.json"
\ No newline at end of file
+OUTPUT_FILE="output/data.json"
+
+# Logging: handlers run on a background thread, LOG_FILE holds one JSON object per line and rotates
+# by size. Per-plate outcomes are sampled (LOG_PLATE_SAMPLE_RATE=0 turns them off) and capped per second
+LOG_FILE="logs/scraper.log"
+LOG_LEVEL="INFO"
+LOG_MAX_MB=50
+LOG_BACKUP_COUNT=5
+LOG_PLATE_SAMPLE_RATE=0.01
+LOG_PLATE_MAX_PER_SECOND=20
+
+# Result journal: "always" fsyncs every group commit, "interval" at most once per
+# JOURNAL_FSYNC_INTERVAL seconds, "never" leaves it to the OS.
+JOURNAL_FSYNC_POLICY="interval"
+JOURNAL_FSYNC_INTERVAL=5.0
+JOURNAL_BATCH_SIZE=50
+JOURNAL_FLUSH_INTERVAL=1.0
+# A finished run compacts the journal (and refreshes data.json) only once it holds this many
+# records per plate; `python -m storage.journal` compacts on demand.
+JOURNAL_COMPACT_RATIO=2.0
+
+# Result store: "journal" appends JSONL (data.jsonl), "sqlite" upserts into an indexed,
+# queryable SQLite table (data.sqlite, see python -m storage.sqlite_store --help)
+RESULT_STORE="journal"
+
+# Columnar copy of the results: Region/Letter-partitioned Parquet (data.json -> data.parquet/),
+# brought up to date from the JSONL journal at the end of every run
+PARQUET_EXPORT=True
+
+# Plate space: regions to crawl, e.g. ["10"] for the Baku-10 crawl
+PLATE_REGIONS=["77", "90", "99"]
+
+# Lookup backend: "browser" drives Chromium, "http" replays the form postback directly
+BACKEND="browser"
+HTTP_TIMEOUT=10.0
+
+# Browser pages: stay on the form between plates and skip resources the result table doesn't need
+WARM_PAGES=True
+BLOCKED_RESOURCE_TYPES=["image", "stylesheet", "font", "media"]
+
+# Browser pool: every page lives in a context of its own, renewed after CONTEXT_MAX_REQUESTS plates or
+# once its JS heap passes CONTEXT_MAX_HEAP_MB (checked every CONTEXT_MEMORY_CHECK_INTERVAL plates).
+# Crashed pages and browsers are replaced and the plate they were on is re-queued
+CONTEXT_MAX_REQUESTS=500
+CONTEXT_MAX_HEAP_MB=256
+CONTEXT_MEMORY_CHECK_INTERVAL=25
+
+# Single deadline for the result table or the not-found message after clicking "Yoxla"
+OUTCOME_TIMEOUT=10000
+
+# Adaptive timeouts: each phase (goto, fill, click, outcome, http) waits TIMEOUT_HEADROOM times the
+# TIMEOUT_QUANTILE of its last TIMEOUT_WINDOW successful durations, within [TIMEOUT_MIN, TIMEOUT_MAX]
+# seconds, and keeps the fixed defaults until it has TIMEOUT_MIN_SAMPLES. All phases of a plate share
+# a PLATE_DEADLINE second budget
+TIMEOUT_QUANTILE=0.99
+TIMEOUT_HEADROOM=3.0
+TIMEOUT_MIN=1.0
+TIMEOUT_MAX=30.0
+TIMEOUT_WINDOW=500
+TIMEOUT_MIN_SAMPLES=50
+PLATE_DEADLINE=30.0
+
+# Circuit breaker: BREAKER_FAILURES failed plates in a row pause all workers for BREAKER_COOLDOWN
+# seconds, then one probe plate decides; every failed probe doubles the pause up to BREAKER_MAX_COOLDOWN
+BREAKER_FAILURES=20
+BREAKER_COOLDOWN=30.0
+BREAKER_MAX_COOLDOWN=600.0
+
+# Sharded crawling: lease queue shared by worker processes (and hosts, on shared storage)
+SHARD_QUEUE_FILE="output/shards.sqlite"
+SHARD_LEASE_SECONDS=300
+
+# Adaptive concurrency (AIMD): grow active pages while the site keeps up, halve them when it doesn't
+ADAPTIVE_CONCURRENCY=True
+MIN_CONCURRENCY=2
+MAX_CONCURRENCY=20
+TARGET_P95_LATENCY=6.0
+TARGET_TIMEOUT_RATE=0.05
+
+# Retries for "Timeout" results: exponential backoff with jitter, interleaved with fresh plates
+RETRY_MAX_ATTEMPTS=3
+RETRY_BASE_DELAY=30.0
+RETRY_MAX_DELAY=600.0
+
+# Run metrics: Prometheus text on /metrics and JSON on /stats (METRICS_PORT=None disables the
+# endpoint), a periodic JSON snapshot, and optional cProfile/tracemalloc profiling of a run
+METRICS_HOST="127.0.0.1"
+METRICS_PORT=9108
+STATS_FILE="output/stats.json"
+PROFILE=False
+
+# Re-crawl (python -m scraper.recrawl): refresh the stalest records within a request budget
+# instead of re-scanning the plate space. Insured cars go first, then other policies and "No Data"
+# answers, timed-out lookups, and finally a capped share of old "Not Found" plates.
+RECRAWL_BUDGET=20000
+RECRAWL_INSURED_MAX_AGE_DAYS=30
+RECRAWL_FOUND_MAX_AGE_DAYS=90
+RECRAWL_FAILED_MAX_AGE_DAYS=1
+RECRAWL_NOT_FOUND_MAX_AGE_DAYS=180
+RECRAWL_NOT_FOUND_SHARE=0.1
+
+# Batch mode (python -m scraper.batch): stored results younger than this are returned as they are
+BATCH_MAX_AGE_DAYS=30
+
+# Density-aware crawl (python -m scraper.density): probe every letter-pair block with a small
+# sample, then scan blocks by estimated hit density until the expected share of all policies
+# reached meets the recall target; sparse blocks beyond it are skipped. Block densities are
+# shrunk towards the global hit rate by DENSITY_PRIOR_STRENGTH pseudo-probes
+DENSITY_SAMPLE_SIZE=20
+DENSITY_RECALL_TARGET=0.95
+DENSITY_PRIOR_STRENGTH=1
+
+# Lookup service (python -m scraper.service): answers from results younger than SERVICE_TTL_HOURS,
+# keeps the SERVICE_CACHE_SIZE most recent answers in an LRU, and scrapes the rest live on warm pages.
+# At most SERVICE_QUEUE_SIZE live lookups wait for a page; beyond that requests get a 503
+SERVICE_HOST="127.0.0.1"
+SERVICE_PORT=8090
+SERVICE_TTL_HOURS=24
+SERVICE_CACHE_SIZE=100000
+SERVICE_QUEUE_SIZE=100
+SERVICE_MAX_BATCH=100
@@ -1,9 +1,109 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from config import LOG_FILE, LOG_LEVEL, LOG_MAX_MB, LOG_BACKUP_COUNT, LOG_PLATE_SAMPLE_RATE, LOG_PLATE_MAX_PER_SECOND
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("logs/scraper.log"), logging.StreamHandler()],
-)
-logger = logging.getLogger(__name__)
\ No newline at end of file
+# Attributes every LogRecord has; anything else on a record came in through ``extra``
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class PlateSampler:
+    """Lets through a ``rate`` share of per-plate events, at most ``max_per_second`` of them."""
+
+    def __init__(self, rate=LOG_PLATE_SAMPLE_RATE, max_per_second=LOG_PLATE_MAX_PER_SECOND):
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self.second = 0
+        self.emitted = 0
+
+    def __call__(self):
+        if self.rate <= 0 or random.random() >= self.rate:
+            return False
+        now = int(time.monotonic())
+        if now != self.second:
+            self.second, self.emitted = now, 0
+        if self.max_per_second and self.emitted >= self.max_per_second:
+            return False
+        self.emitted += 1
+        return True
+
+
+def file_handler_for(log_file):
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_MB * 2**20, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def start_listener(log_file=LOG_FILE):
+    """Routes every record through a queue to the file and console handlers on a background thread.
+
+    Callers on the event loop only pay for putting the record on the queue; the
+    JSON encoding, console writes and size-based rotation happen on the listener.
+    """
+    file_handler = file_handler_for(log_file)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    listener = logging.handlers.QueueListener(records, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Drains the queue so the last lines reach the file
+    return listener
+
+
+listener = None  # Started by the entry points, so importing a module creates no log file
+logger = logging.getLogger(__name__)
+plate_logger = logging.getLogger("scraper.plates")
+sample_plate = PlateSampler()
+
+
+def start_logging(log_file=LOG_FILE):
+    """Starts the listener on first use and returns it; called from each command's entry point."""
+    global listener
+    if listener is None:
+        listener = start_listener(log_file)
+    return listener
+
+
+def use_log_file(log_file):
+    """Switches the file output to another rotating file, e.g. one per worker process.
+
+    Several processes rotating the same file would clobber each other's lines.
+    """
+    if listener is None:
+        start_logging(log_file)
+        return
+    old_handler, *others = listener.handlers
+    listener.handlers = (file_handler_for(log_file), *others)
+    old_handler.close()
+
+
+def plate_event(plate_number, outcome, **fields):
+    """Logs the outcome of one plate, if the sampler picks it; cheap to call when it doesn't."""
+    if sample_plate():
+        plate_logger.info(f"{plate_number}: {outcome}", extra={"plate": plate_number, "outcome": outcome, **fields})
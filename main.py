@@ -1,133 +1,495 @@
-import json
 import asyncio
-import string
-from itertools import product
+import os
+import time
+from collections import deque
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-from config import TARGET_URL, OUTPUT_FILE
-from logger.logger import logger
+from config import (
+    TARGET_URL, OUTPUT_FILE, PLATE_REGIONS, BACKEND, ADAPTIVE_CONCURRENCY, MAX_CONCURRENCY,
+    METRICS_PORT, STATS_FILE, PROFILE, WARM_PAGES, PARQUET_EXPORT, RESULT_STORE, PLATE_DEADLINE,
+    JOURNAL_COMPACT_RATIO,
+)
+from logger.logger import logger, plate_event, start_logging
 from models.models import InsuranceData
+from storage.journal import ResultJournal, journal_path
+from storage.sqlite_store import SqliteStore, store_path
+from storage.parquet import ParquetExporter, dataset_path
+from storage.aggregates import AggregateStore, aggregates_path, save_tables
+from storage.bitmap import CompletionBitmap, bitmap_path, STATE_EMPTY, STATE_DONE, STATE_FOUND, STATE_FAILED
+from scraper.plates import PlateSpace, PlateCursor, cursor_path
+from scraper.pool import WorkerPool
+from scraper.http_backend import HttpBackend, StaleStateError
+from scraper.page import PageStats
+from scraper.browser_pool import BrowserPool, is_crash
+from scraper.outcome import detect_outcome, FOUND, NOT_FOUND, TIMEOUT
+from scraper.extract import extract_result
+from scraper.concurrency import AdaptiveConcurrency
+from scraper.retry import RetryScheduler
+from scraper.timeouts import AdaptiveTimeouts, CircuitBreaker, Deadline
+from scraper.metrics import Metrics, RunProfiler, serve_metrics
+
+RETRYABLE_RESULTS = {TIMEOUT}
+
+
+def is_retryable(result):
+    return isinstance(result, str) and result in RETRYABLE_RESULTS
+
+
+def result_state(result):
+    """Completion bitmap state of a result."""
+    if isinstance(result, dict):
+        return STATE_FOUND
+    return STATE_FAILED if is_retryable(result) else STATE_DONE
 
 class InsuranceScraper:
-    def __init__(self, output_file="insurance_data.json", concurrency=5):
-        self.url = TARGET_URL
-        self.output_file = OUTPUT_FILE
+    def __init__(self, output_file=OUTPUT_FILE, concurrency=5, regions=PLATE_REGIONS, prefixes=None, shard=0, shards=1,
+                 backend=BACKEND, url=TARGET_URL, adaptive=ADAPTIVE_CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+                 metrics_port=METRICS_PORT, profile=PROFILE, warm_pages=WARM_PAGES, parquet=PARQUET_EXPORT,
+                 store=RESULT_STORE, plate_deadline=PLATE_DEADLINE):
+        if backend not in ("browser", "http"):
+            raise ValueError(f"Unknown backend: {backend}")
+        if store not in ("journal", "sqlite"):
+            raise ValueError(f"Unknown result store: {store}")
+        self.url = url
+        self.backend = backend  # "browser" or "http"
+        self.output_file = output_file
+        self.plate_space = PlateSpace(regions, prefixes, shard, shards)
+        self.cursor = PlateCursor(cursor_path(self.output_file), self.plate_space)
+        if store == "sqlite":
+            self.journal = SqliteStore(store_path(self.output_file))  # Same interface as the journal
+        else:
+            self.journal = ResultJournal(journal_path(self.output_file))
+        self.parquet = None
+        if parquet and store == "journal":  # The export follows the JSONL journal
+            self.parquet = ParquetExporter(dataset_path(self.output_file), self.journal.journal_file)
+        self.retries = RetryScheduler()
+        self.timeouts = AdaptiveTimeouts()  # Per-phase timeouts from recent latencies
+        self.breaker = CircuitBreaker()  # Pauses every worker while the site is down
+        self.plate_deadline = plate_deadline  # Seconds one plate may take over all its phases
+        self.attempts = {}  # Tries so far for plates that are in flight or waiting for a retry
+        self.failed = {}  # Tries of plates whose latest record is a failure (retried while they have tries left)
+        self.aggregates_file = aggregates_path(self.output_file)  # None keeps them in memory only
+        # "Was this plate done?" is answered by the bitmap; full records only stay in memory until it has them
+        self.bitmap = CompletionBitmap(bitmap_path(self.output_file))
+        self.unmarked = {}  # plate -> bitmap state of results saved since the last checkpoint
+        self.record_count = 0  # Records in the store, superseded ones included
+        # Checkpoints waiting for the store: (position future, unmarked, failed, tables, record count)
+        self.marking = deque()
+        self.aggregates = self.sync_bitmap()  # Chart tables, kept current per plate
         self.results = self.load_existing_data()
-        self.concurrency = concurrency  # Number of concurrent scrapers
+        self.concurrency = concurrency  # Number of concurrent scrapers (the starting level if adaptive)
+        # Adaptive mode opens max_concurrency pages and lets the controller decide how many work
+        self.controller = AdaptiveConcurrency(initial=concurrency, maximum=max_concurrency) if adaptive else None
+        self.page_count = max(concurrency, max_concurrency) if adaptive else concurrency
+        self.pool = None
+        self.last_dispatched = -1
+        self.http_backend = None
+        self.playwright = None
+        self.browsers = None  # BrowserPool of the worker pages (browser backend)
+        self.fallback_browsers = None  # Single-page BrowserPool for HTTP fallbacks, launched on first use
+        self.fallback_lock = asyncio.Lock()
+        self.page_stats = PageStats()
+        self.metrics = Metrics(gauges=lambda: self.collect_stats(self.pool.stats()) if self.pool else {})
+        self.metrics_port = metrics_port
+        self.stats_file = STATS_FILE  # Periodic JSON snapshot of the run metrics
+        self.profiler = RunProfiler(os.path.dirname(self.output_file) or ".") if profile else None
+        self.warm_pages = warm_pages
+
+    def sync_bitmap(self):
+        """Brings the completion bitmap and retry counts up to date with the store; returns the aggregates.
+
+        After a clean stop nothing is read, after an interrupted run only the
+        records written since the last checkpoint. The whole store is replayed
+        only when the bitmap is missing or the store was rewritten under it.
+        """
+        meta = self.bitmap.open(self.plate_space.regions)
+        records = self.journal.records_since(meta["store"]) if meta else None
+        if records is None:
+            logger.info("Building the completion bitmap from the result store.")
+            self.bitmap.clear()
+            latest = {}
+            for record in self.journal.replay_records():
+                latest[record["plate"]] = record["result"]
+                self.mark_record(record)
+                self.record_count += 1
+            if not latest:
+                # First run on top of an old full-JSON crawl: seed the journal from it
+                latest = self.journal.import_snapshot(self.output_file)
+                for plate, result in latest.items():
+                    self.mark_record({"plate": plate, "result": result})
+                self.record_count = len(latest)
+            aggregates = AggregateStore.from_results(latest)
+        else:
+            self.failed = dict(meta["failed"])
+            self.record_count = meta.get("records", self.stored_plates())
+            aggregates = None
+            if self.aggregates_file and os.path.exists(self.aggregates_file):
+                aggregates = AggregateStore.load(self.aggregates_file)
+            if aggregates is None or aggregates.position != meta["store"]:
+                aggregates = None  # Saved at another point than the bitmap: recounted below
+            replayed = {}
+            for record in records:
+                plate, result = record["plate"], record["result"]
+                # The failures saved with the checkpoint match it; the bits may already be past it
+                if plate in replayed:
+                    previous = replayed[plate]
+                elif plate in meta["failed"]:
+                    previous = TIMEOUT
+                elif self.bitmap.get(plate) == STATE_EMPTY:
+                    previous = None
+                else:
+                    aggregates = previous = None  # Its result at the checkpoint is not in the tail: recounted below
+                if aggregates is not None and result != previous:
+                    aggregates.replace(previous, result)
+                replayed[plate] = result
+                self.mark_record(record)
+                self.record_count += 1
+            if aggregates is None:
+                aggregates = AggregateStore.from_results(self.journal.replay())
+        # Only failed plates that still have tries left are worth retrying
+        self.attempts = {
+            plate: attempts for plate, attempts in self.failed.items() if attempts < self.retries.max_attempts
+        }
+        return aggregates
+
+    def mark_record(self, record):
+        """Applies one stored record to the bitmap and the retry counts."""
+        plate, result = record["plate"], record["result"]
+        self.bitmap.set(plate, result_state(result))
+        if is_retryable(result):
+            self.failed[plate] = record.get("attempts", 1)  # Legacy records carry no count
+        else:
+            self.failed.pop(plate, None)
+
+    def stored_plates(self):
+        """Number of plates the bitmap holds a result for."""
+        return len(self.bitmap.space) - self.bitmap.counts[STATE_EMPTY]
 
     def load_existing_data(self):
-        """Loads existing JSON data to avoid duplicates if the script is interrupted."""
-        try:
-            with open(self.output_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_data(self):
-        """Saves scraped data to a JSON file."""
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(self.results, f, indent=4, ensure_ascii=False)
-
-    async def scrape(self, plate_number, page):
-        """Scrapes insurance data for a given plate number using an async page."""
-        try:
-            await page.goto(self.url, timeout=5000)  # 5-second timeout
+        """Returns the stored records to keep in memory; a crawl needs none, the bitmap knows what is done."""
+        return {}
 
-            # Fill in the plate number
-            input_selector = "input[name='carNumber']"
-            await page.fill(input_selector, plate_number)
+    def is_done(self, plate_number):
+        """Whether a plate has a result, in memory or in the bitmap."""
+        return plate_number in self.results or self.bitmap.get(plate_number) != STATE_EMPTY
 
-            # Click the "Yoxla" button
-            button_selector = "#pageBody_btnCheck"
-            await page.click(button_selector)
-            # Check if "Məlumat tapılmadı" (No Data) appears
-            error_selector = "#divError"
-            try:
-                await page.wait_for_selector(error_selector, timeout=3000)  # 3s timeout
-                error_text = await page.inner_text(error_selector)
-                if "Məlumat tapılmadı" in error_text:
-                    #logger.info(f"No data for {plate_number}.")
-                    print(f"No data for {plate_number}.")
-                    self.results[plate_number] = "Not Found"
-                    self.save_data()
-                    return  # Skip further processing
-            except PlaywrightTimeoutError:
-                pass  # If error message doesn't appear, continue to scrape results
-
-            # Wait for results table
-            table_selector = ".result-area tbody"
-            await page.wait_for_selector(table_selector, timeout=7000)
-
-            # Extract data
-            rows = await page.query_selector_all(f"{table_selector} tr")
-            if rows:
-                for row in rows:
-                    cells = await row.query_selector_all("td")
-                    if len(cells) >= 5:
-                        self.results[plate_number] = {
-                            "Təşkilat": await cells[0].inner_text(),
-                            "Dövlət qeydiyyat nömrəsi": await cells[1].inner_text(),
-                            "Marka": await cells[2].inner_text(),
-                            "Model": await cells[3].inner_text(),
-                            "Status": await cells[4].inner_text(),
-                        }
-                        #logger.info(self.results[plate_number])
-                        print(self.results[plate_number])
-                        break
+    def previous_result(self, plate_number):
+        """The plate's latest result, for retracting it from the aggregates (None if it has none).
+
+        Records evicted from memory are only needed again for retries, whose
+        previous result the bitmap pins down; modes that re-scrape finished plates
+        keep those records in ``self.results``.
+        """
+        result = self.results.get(plate_number)
+        if result is None and self.bitmap.get(plate_number) == STATE_FAILED:
+            result = TIMEOUT
+        return result
+
+    def save_data(self, plate_number):
+        """Appends the result for a plate, with the number of tries it took and when, to the journal."""
+        with self.metrics.time("save"):
+            result = self.results[plate_number]
+            attempts = self.attempts.get(plate_number, 1)
+            self.journal.append(plate_number, result, attempts=attempts, scraped_at=int(time.time()))
+            self.record_count += 1
+            self.unmarked[plate_number] = result_state(result)
+            if is_retryable(result):
+                self.failed[plate_number] = attempts
             else:
-                #logger.info(f"No data found for {plate_number}.")
-                print(f"No data found for {plate_number}.")
-                self.results[plate_number] = "No Data"
+                self.failed.pop(plate_number, None)
+
+    async def scrape(self, plate_number, page, deadline=None):
+        """Scrapes insurance data for a given plate number using a FormPage, within the plate's deadline."""
+        try:
+            # Fill in the plate number and click "Yoxla", reusing the loaded form when possible
+            await page.submit(plate_number, deadline=deadline)
+
+            # Wait once for either "Məlumat tapılmadı" or the results table
+            waited_from = time.monotonic()
+            with self.metrics.time("outcome_wait"):
+                outcome = await detect_outcome(page, self.timeouts.ms("outcome", deadline))
+            if outcome != TIMEOUT:
+                self.timeouts.record("outcome", time.monotonic() - waited_from)
+            if outcome == NOT_FOUND:
+                self.results[plate_number] = "Not Found"
+                self.save_data(plate_number)
+                return  # Skip further processing
+            if outcome == TIMEOUT:
+                raise PlaywrightTimeoutError(f"No outcome for {plate_number}")
+
+            # Extract every row of the table in one round trip
+            result = None
+            if outcome == FOUND:
+                with self.metrics.time("extract"):
+                    result = await extract_result(page)
+            self.results[plate_number] = result if result is not None else "No Data"
 
         except PlaywrightTimeoutError:
-            #logger.info(f"TIMEOUT: Skipping {plate_number} due to no response.")
-            print(f"TIMEOUT: Skipping {plate_number} due to no response.")
             self.results[plate_number] = "Timeout"
+            page.invalidate()  # Don't trust this page's DOM for the next plate
+
+        # Journal after each request
+        self.save_data(plate_number)
+
+    async def scrape_http(self, plate_number, deadline=None):
+        """Looks a plate up through the HTTP backend, falling back to the browser if it fails."""
+        try:
+            started = time.monotonic()
+            with self.metrics.time("http_lookup"):
+                result = await self.http_backend.lookup(plate_number, self.timeouts.get("http", deadline))
+            self.results[plate_number] = result
+        except StaleStateError as e:
+            logger.warning(f"HTTP backend failed for {plate_number} ({e}), falling back to the browser.")
+            await self.fallback_scrape(plate_number, deadline)
+            return
+        if result != TIMEOUT:
+            self.timeouts.record("http", time.monotonic() - started)
+        self.save_data(plate_number)
+
+    async def fallback_scrape(self, plate_number, deadline=None):
+        """Scrapes one plate on a lazily launched browser page shared by all fallbacks."""
+        async with self.fallback_lock:
+            if self.fallback_browsers is None:
+                self.fallback_browsers = BrowserPool(
+                    self.playwright, self.url, self.page_stats, 1, warm=self.warm_pages, metrics=self.metrics,
+                    timeouts=self.timeouts,
+                )
+            async with self.fallback_browsers.slots[0].use() as page:
+                await self.scrape(plate_number, page, deadline)
+
+    def generate_plate_numbers(self, start=0):
+        """Lazily yields plate numbers (excluding I and W) from the given cursor."""
+        return self.plate_space.plates(start)
+
+    def pending_indices(self, start=0):
+        """Yields indices of plates from the cursor on that have no result yet."""
+        for index in self.plate_space.indices(start):
+            self.last_dispatched = index
+            if not self.is_done(self.plate_space.decode(index)):
+                yield index
+
+    async def scheduled_indices(self, start=0):
+        """Interleaves due retries with fresh plates, then waits out the remaining retries."""
+        for plate, attempts in list(self.attempts.items()):
+            try:
+                self.retries.schedule(self.plate_space.encode(plate), attempts, delay=0)
+            except ValueError:
+                del self.attempts[plate]  # Failed in a crawl of another plate space
+        for index in self.pending_indices(start):
+            while (retry := self.retries.pop_due()) is not None:
+                yield retry
+            yield index
+        while not self.pool.stopping:
+            retry = self.retries.pop_due()
+            if retry is not None:
+                yield retry
+                continue
+            if not self.retries and not self.pool.in_flight and not self.pool.queue.qsize():
+                return  # Nothing left that could still schedule a retry
+            due_in = self.retries.next_due_in()
+            await asyncio.sleep(1.0 if due_in is None else min(due_in, 1.0))
+
+    def retry_later(self, index, plate_number, delay=None):
+        if not self.retries.schedule(index, self.attempts[plate_number], delay):
+            logger.warning(f"Giving up on {plate_number} after {self.attempts[plate_number]} attempts.")
+            del self.attempts[plate_number]
+
+    def watermark(self):
+        """Index before which every plate has been handled; safe to persist as the cursor."""
+        if self.pool.unfinished:
+            return min(self.pool.unfinished)
+        return self.last_dispatched + 1
+
+    def checkpoint_cursor(self):
+        """Persists the watermark once the journal holds every result before it."""
+        self.journal.checkpoint(self.cursor.save, self.watermark())
+
+    def checkpoint_bitmap(self):
+        """Queues the results saved so far to be marked in the bitmap once the store holds them."""
+        tables = self.aggregates.to_dict() if self.aggregates_file else None
+        position = self.journal.checkpoint(self.journal.position)
+        self.marking.append((position, self.unmarked, dict(self.failed), tables, self.record_count))
+        self.unmarked = {}
+        self.mark_results()
+
+    def mark_results(self):
+        """Marks the results of finished checkpoints in the bitmap and drops their records from memory.
+
+        The bits are flushed before the sidecar and aggregates record the store
+        position they match, so a crash at any point is caught up by replaying
+        the store from that position.
+        """
+        saved = None
+        while self.marking and self.marking[0][0].done():
+            saved = self.marking.popleft()
+            saved[0].result()  # Raises if the store failed to write the batch: its plates must not be marked done
+            for plate, state in saved[1].items():
+                self.bitmap.set(plate, state)
+                if plate not in self.unmarked:  # Not saved again since
+                    self.results.pop(plate, None)
+        if saved is not None:
+            position, _, failed, tables, records = saved
+            self.bitmap.flush()
+            if tables is not None:
+                save_tables(tables, self.aggregates_file, position.result())
+            self.bitmap.save(store=position.result(), failed=failed, records=records)
+
+    def mark_all(self):
+        """Marks every result saved so far, waiting for the store to hold them."""
+        self.checkpoint_bitmap()
+        self.marking[-1][0].result()
+        self.mark_results()
+
+    def close_bitmap(self):
+        """Marks every remaining result and records the store's final position."""
+        self.mark_all()
+        self.bitmap.close()
+
+    async def scrape_plate(self, plate, page):
+        """Scrapes one plate on a worker's page (None with the http backend) and returns its result.
+
+        Records the result, the aggregates, the metrics and the breaker feedback;
+        retries are up to the caller.
+        """
+        probe = await self.breaker.admit()
+        self.attempts[plate] = self.attempts.get(plate, 0) + 1
+        previous = self.previous_result(plate)
+        started = time.monotonic()
+        deadline = Deadline(self.plate_deadline)
+        try:
+            with self.metrics.time("plate"):
+                if self.backend == "http":
+                    await self.scrape_http(plate, deadline)
+                else:
+                    async with page.use() as form_page:  # ``page`` is this worker's PageSlot
+                        await self.scrape(plate, form_page, deadline)
+        except asyncio.CancelledError:
+            self.breaker.release_probe(probe)  # Says nothing about the site
+            raise
+        except Exception:
+            self.breaker.record(True, probe)
+            self.metrics.count_outcome("exception")
+            self.update_aggregates(plate, previous)
+            raise
+        self.update_aggregates(plate, previous)
+        result = self.results.get(plate)
+        self.breaker.record(is_retryable(result), probe)
+        outcome = "found" if isinstance(result, dict) else result
+        self.metrics.count_outcome(outcome)
+        plate_event(plate, outcome, seconds=round(time.monotonic() - started, 3), attempt=self.attempts[plate],
+                    **({"result": result} if outcome == "found" else {}))
+        if self.controller:
+            self.controller.record(time.monotonic() - started, result == "Timeout")
+        return result
+
+    async def scrape_index(self, index, page):
+        plate = self.plate_space.decode(index)
+        try:
+            result = await self.scrape_plate(plate, page)
+        except Exception as e:
+            # A crash is the page's fault, not the plate's: run it again right away on a fresh page
+            self.retry_later(index, plate, delay=0 if is_crash(e) else None)
+            raise
+        if is_retryable(result):
+            self.retry_later(index, plate)
+        else:
+            self.attempts.pop(plate, None)
+
+    def update_aggregates(self, plate, previous):
+        """Moves a plate's contribution to the aggregates from its previous result to the new one."""
+        result = self.results.get(plate)
+        if result is not None and result != previous:
+            self.aggregates.replace(previous, result)
+
+    def collect_stats(self, stats):
+        """Adds page and concurrency controller counters to the worker pool stats."""
+        stats.update(self.page_stats.as_dict())
+        if self.controller:
+            stats.update(self.controller.stats())
+        stats.update(self.retries.stats())
+        stats.update(self.timeouts.stats())
+        stats.update(self.breaker.stats())
+        if self.browsers:
+            stats.update(self.browsers.stats())
+        stats.update(self.bitmap.stats())
+        stats["records_in_memory"] = len(self.results)
+        if self.profiler:
+            stats.update(self.profiler.stats())
+        return stats
+
+    def report_progress(self, stats):
+        logger.info(f"Progress: {self.collect_stats(stats)}")
+        self.metrics.write_snapshot(self.stats_file)
+        self.checkpoint_cursor()
+        self.checkpoint_bitmap()  # Also saves the aggregates
+
+    def open_pages(self, playwright):
+        """Sets up the lookup backend; returns one resource per worker (a PageSlot, or None for HTTP)."""
+        self.playwright = playwright
+        if self.backend == "http":
+            # Workers share the connection pool; a browser is only launched for fallbacks
+            self.http_backend = HttpBackend(self.url, pool_size=self.page_count)
+            return [None] * self.page_count
+        # Contexts open lazily on each worker's first plate and are renewed as they age or crash
+        self.browsers = BrowserPool(
+            playwright, self.url, self.page_stats, self.page_count, warm=self.warm_pages, metrics=self.metrics,
+            timeouts=self.timeouts,
+        )
+        return self.browsers.slots
 
-        # Save after each request
-        self.save_data()
-
-    def generate_plate_numbers(self):
-        """Generates all possible plate numbers (excluding I and W)."""
-        regions = ["77", "90", "99"]
-        letters = [
-            ch1 + ch2
-            for ch1, ch2 in product(string.ascii_uppercase, repeat=2)
-            if "I" not in [ch1, ch2] and "W" not in [ch1, ch2]
-        ]
-        numbers = [f"{num:03}" for num in range(1, 1000)]  # 001 to 999
-
-        plates = []
-        for region in regions:
-            for letter in letters:
-                for number in numbers:
-                    plates.append(f"{region}{letter}{number}")
-                    
-        return plates
+    async def close_pages(self):
+        for browsers in (self.browsers, self.fallback_browsers):
+            if browsers is not None:
+                await browsers.close()
+        if self.http_backend is not None:
+            self.http_backend.close()
 
     async def run(self):
-        """Runs the scraper asynchronously with multiple pages."""
-        plates_to_scrape = [
-            plate for plate in self.generate_plate_numbers() if plate not in self.results
-        ]
+        """Runs the scraper asynchronously with a pool of pages fed from a work queue."""
+        start = self.cursor.load()
+        self.last_dispatched = start - 1
+        server = await serve_metrics(self.metrics, port=self.metrics_port) if self.metrics_port else None
+        if self.profiler:
+            self.profiler.start()
 
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            pages = [await browser.new_page() for _ in range(self.concurrency)]
+            pages = self.open_pages(p)
+            self.pool = WorkerPool(
+                self.scrape_index, pages, on_report=self.report_progress, limiter=self.controller
+            )
+            stats = await self.pool.run(self.scheduled_indices(start))
+            logger.info(f"Run stats: {self.collect_stats(stats)}")
+            await self.close_pages()
 
-            tasks = []
-            for i, plate in enumerate(plates_to_scrape):
-                page = pages[i % self.concurrency]  # Assign tasks across available pages
-                #logger.info(f"Checking: {plate}")
-                print(f"Checking: {plate}")
-                tasks.append(self.scrape(plate, page))
+        self.metrics.write_snapshot(self.stats_file)
+        if self.profiler:
+            self.profiler.stop()
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+        self.finish()
 
-                if len(tasks) >= self.concurrency:  # Process in batches
-                    await asyncio.gather(*tasks)
-                    tasks = []  # Reset the batch
+    def finish(self):
+        """Persists the cursor, bitmap and aggregates and brings the Parquet dataset up to date.
 
-            await asyncio.gather(*tasks)  # Process remaining tasks
-            await browser.close()
+        Only this run's records are read. The journal is compacted, and the JSON
+        snapshot refreshed, once superseded records have grown it to
+        JOURNAL_COMPACT_RATIO records per plate.
+        """
+        self.checkpoint_cursor()
+        if self.parquet:
+            self.journal.close()
+            self.parquet.export()  # Only this run's records, before compaction rewrites the journal
+        self.mark_all()
+        plates = self.stored_plates()
+        if self.record_count > JOURNAL_COMPACT_RATIO * plates:
+            logger.info(f"Compacting {self.record_count} records of {plates} plates.")
+            self.journal.compact(self.output_file)
+            self.record_count = plates
+            if self.parquet:
+                self.parquet.mark_exported()
+        self.close_bitmap()  # At the store's final position, so the next run reads nothing
 
 if __name__ == "__main__":
+    start_logging()
     scraper = InsuranceScraper(concurrency=10)  # Adjust concurrency for faster scraping
     asyncio.run(scraper.run())
@@ -1,12 +1,14 @@
 import json
 import asyncio
 import string
-from logger import logger
+from logger.logger import logger, start_logging
 from itertools import product
 from typing import Dict, List, Optional
 from pydantic import BaseModel, ValidationError
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from config import TARGET_URL
+from scraper.pool import WorkerPool
+from scraper.outcome import detect_outcome, NOT_FOUND, TIMEOUT
 
 
 OUTPUT_FILE = "output/data_new.json"
@@ -63,40 +65,30 @@ class InsuranceScraper:
             button_selector = "#pageBody_btnCheck"
             await page.click(button_selector)
 
-            # Check if "Məlumat tapılmadı" (No Data) appears
-            error_selector = "#divError"
-            try:
-                await page.wait_for_selector(error_selector, timeout=3000)  # 3s timeout
-                error_text = await page.inner_text(error_selector)
-                if "Məlumat tapılmadı" in error_text:
-                    logger.info(f"No data for {plate_number}.")
-                    self.results[plate_number] = InsuranceData(plate_number=plate_number, error="Not Found")
+            # Wait once for either "Məlumat tapılmadı" or the results table
+            outcome = await detect_outcome(page)
+            if outcome in (NOT_FOUND, TIMEOUT):
+                logger.info(f"{outcome} for {plate_number}.")
+                self.results[plate_number] = InsuranceData(plate_number=plate_number, error=outcome)
+                self.buffer.append(self.results[plate_number])  # Add to buffer
+                return  # Skip further processing
+
+            # Extract data from the first row with every column
+            rows = await page.query_selector_all(".result-area tbody tr")
+            for row in rows:
+                cells = await row.query_selector_all("td")
+                if len(cells) >= 5:
+                    self.results[plate_number] = InsuranceData(
+                        plate_number=plate_number,
+                        organization=await cells[0].inner_text(),
+                        registration_number=await cells[1].inner_text(),
+                        brand=await cells[2].inner_text(),
+                        model=await cells[3].inner_text(),
+                        status=await cells[4].inner_text(),
+                    )
+                    logger.info(f"Scraped data for {plate_number}: {self.results[plate_number]}")
                     self.buffer.append(self.results[plate_number])  # Add to buffer
-                    return  # Skip further processing
-            except PlaywrightTimeoutError:
-                pass  # If error message doesn't appear, continue to scrape results
-
-            # Wait for results table
-            table_selector = ".result-area tbody"
-            await page.wait_for_selector(table_selector, timeout=7000)
-
-            # Extract data
-            rows = await page.query_selector_all(f"{table_selector} tr")
-            if rows:
-                for row in rows:
-                    cells = await row.query_selector_all("td")
-                    if len(cells) >= 5:
-                        self.results[plate_number] = InsuranceData(
-                            plate_number=plate_number,
-                            organization=await cells[0].inner_text(),
-                            registration_number=await cells[1].inner_text(),
-                            brand=await cells[2].inner_text(),
-                            model=await cells[3].inner_text(),
-                            status=await cells[4].inner_text(),
-                        )
-                        logger.info(f"Scraped data for {plate_number}: {self.results[plate_number]}")
-                        self.buffer.append(self.results[plate_number])  # Add to buffer
-                        break
+                    break
             else:
                 logger.info(f"No data found for {plate_number}.")
                 self.results[plate_number] = InsuranceData(plate_number=plate_number, error="No Data")
@@ -134,32 +126,20 @@ class InsuranceScraper:
 
     async def run(self):
         """Runs the scraper asynchronously with multiple pages."""
-        plates_to_scrape = [
+        plates_to_scrape = (
             plate for plate in self.generate_plate_numbers() if plate not in self.results
-        ]
+        )
 
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
             pages = [await browser.new_page() for _ in range(self.concurrency)]
 
-            semaphore = asyncio.Semaphore(self.concurrency)
-            async def limited_scrape(plate, page):
-                async with semaphore:
-                    await self.scrape(plate, page)
-
-            # Process plates in batches
-            batch_size = self.concurrency * 10  # Adjust batch size as needed
-            for i in range(0, len(plates_to_scrape), batch_size):
-                batch = plates_to_scrape[i:i + batch_size]
-                tasks = []
-                for j, plate in enumerate(batch):
-                    page = pages[j % self.concurrency]
-                    logger.info(f"Checking: {plate}")
-                    tasks.append(limited_scrape(plate, page))
-
-                # Execute the current batch of tasks
-                await asyncio.gather(*tasks)
-                logger.info(f"Completed batch {i // batch_size + 1}")
+            async def checked_scrape(plate, page):
+                logger.info(f"Checking: {plate}")
+                await self.scrape(plate, page)
+
+            # Each page pulls the next plate as soon as it is free
+            await WorkerPool(checked_scrape, pages).run(plates_to_scrape)
 
             # Close pages and browser after all tasks are done
             for page in pages:
@@ -171,5 +151,6 @@ class InsuranceScraper:
             self.save_data()
 
 if __name__ == "__main__":
+    start_logging()
     scraper = InsuranceScraper(concurrency=10, batch_size=100)
     asyncio.run(scraper.run())
\ No newline at end of file
@@ -1,16 +1,90 @@
 import json
+import sys
 from config import OUTPUT_FILE
 
+# Columns of the ISB result table, in page order, as stored in the scraped JSON
+RESULT_FIELDS = ["Təşkilat", "Dövlət qeydiyyat nömrəsi", "Marka", "Model", "Status"]
+JSON_WHITESPACE = " \t\n\r"
+
+
+def iter_json_items(json_file, chunk_size=1 << 20):
+    """Yields the (key, value) pairs of a top-level JSON object without loading the whole file.
+
+    Only one chunk of text and the value being decoded are held at a time, so a
+    multi-million-plate data.json streams in bounded memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file, "r", encoding="utf-8") as f:
+        buffer, pos = "", 0
+
+        def read_more():
+            nonlocal buffer, pos
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return False
+            buffer, pos = buffer[pos:] + chunk, 0
+            return True
+
+        def next_token():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not read_more():
+                    raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+
+        def next_value():
+            nonlocal pos
+            next_token()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not read_more():
+                        raise
+                    continue  # The value runs past this chunk
+                if end == len(buffer) and read_more():
+                    continue  # A number or literal may continue in the next chunk
+                pos = end
+                return value
+
+        if next_token() != "{":
+            raise json.JSONDecodeError("Expected an object", buffer, pos)
+        pos += 1
+        if next_token() == "}":
+            return
+        while True:
+            key = next_value()
+            if next_token() != ":":
+                raise json.JSONDecodeError("Expected ':'", buffer, pos)
+            pos += 1
+            yield key, next_value()
+            token = next_token()
+            pos += 1
+            if token == "}":
+                return
+            if token != ",":
+                raise json.JSONDecodeError("Expected ',' or '}'", buffer, pos - 1)
+
+
 class CarInsurance:
-    """Model representing a car's insurance information."""
-    
+    """Model representing a car's insurance information.
+
+    Slots instead of a per-instance ``__dict__``, and the repetitive organization,
+    brand, model and status strings are interned so every car shares one copy.
+    """
+
+    __slots__ = ("plate_number", "organization", "registration_number", "brand", "model", "status")
+
     def __init__(self, plate_number, organization, registration_number, brand, model, status):
         self.plate_number = plate_number  # e.g., "10AA001"
-        self.organization = organization  # e.g., "Some Insurance Company"
+        self.organization = sys.intern(organization)  # e.g., "Some Insurance Company"
         self.registration_number = registration_number  # e.g., "10AA001"
-        self.brand = brand  # e.g., "BMW"
-        self.model = model  # e.g., "X5"
-        self.status = status  # e.g., "Valid"
+        self.brand = sys.intern(brand)  # e.g., "BMW"
+        self.model = sys.intern(model)  # e.g., "X5"
+        self.status = sys.intern(status)  # e.g., "Valid"
 
     def __repr__(self):
         """String representation of the object."""
@@ -32,48 +106,84 @@ class CarInsurance:
 
 
 class InsuranceData:
-    """Class for loading and managing the insurance dataset."""
+    """Class for loading and managing the insurance dataset.
+
+    With ``stream=True`` nothing is loaded up front: iterating the dataset streams
+    the JSON file and yields one CarInsurance at a time. Passing a
+    ``storage.sqlite_store.SqliteStore`` as ``store`` reads from its indexes instead.
+    """
     
-    def __init__(self, json_file="output/tmp.json"):
+    def __init__(self, json_file="output/tmp.json", stream=False, store=None):
         self.json_file = json_file
-        self.insurance_entries = self.load_data()
+        self.store = store
+        self.insurance_entries = None
+        if not stream and store is None:
+            self.insurance_entries = self.load_data()
 
-    def load_data(self):
-        """Loads JSON data and returns a list of CarInsurance objects."""
+    def __iter__(self):
+        """Yields CarInsurance objects, from memory if loaded, otherwise straight from the file or store."""
+        if self.insurance_entries is not None:
+            yield from self.insurance_entries
+            return
+        if self.store is not None:
+            for plate, details in self.store.query(outcome="Found"):
+                yield CarInsurance.from_json(plate, details)
+            return
         try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            for plate, details in iter_json_items(self.json_file):
+                entry = CarInsurance.from_json(plate, details)
+                if entry is not None:  # Skips 'Not Found', 'No Data' and 'Timeout'
+                    yield entry
         except (FileNotFoundError, json.JSONDecodeError):
             print("Error: JSON file not found or invalid.")
-            return []
 
-        # Convert JSON data into list of CarInsurance objects
-        return [CarInsurance.from_json(plate, details) for plate, details in data.items() if CarInsurance.from_json(plate, details)]
+    def load_data(self):
+        """Loads JSON data and returns a list of CarInsurance objects."""
+        return list(self)
+
+    def get_unique_values(self):
+        """Returns the unique organizations and brands, collected in a single pass."""
+        if self.store is not None:
+            return self.get_unique_organizations(), self.get_unique_brands()
+        organizations, brands = set(), set()
+        for entry in self:
+            organizations.add(entry.organization)
+            brands.add(entry.brand)
+        return organizations, brands
 
     def get_unique_organizations(self):
         """Returns a set of unique insurance organizations."""
-        return {entry.organization for entry in self.insurance_entries}
+        if self.store is not None:
+            return self.store.distinct("organization")
+        return {entry.organization for entry in self}
 
     def get_unique_brands(self):
         """Returns a set of unique car brands."""
-        return {entry.brand for entry in self.insurance_entries}
+        if self.store is not None:
+            return self.store.distinct("brand")
+        return {entry.brand for entry in self}
 
     def print_summary(self):
         """Prints unique organizations and brands."""
+        organizations, brands = self.get_unique_values()
         print("\n✅ Unique Insurance Organizations:")
-        for org in sorted(self.get_unique_organizations()):
+        for org in sorted(organizations):
             print(f"  - {org}")
 
         print("\n✅ Unique Car Brands:")
-        for brand in sorted(self.get_unique_brands()):
+        for brand in sorted(brands):
             print(f"  - {brand}")
 
     def __repr__(self):
         """String representation of the dataset."""
+        if self.store is not None:
+            return f"<InsuranceDatabase backed by {self.store.db_file}>"
+        if self.insurance_entries is None:
+            return f"<InsuranceDatabase streaming from {self.json_file}>"
         return f"<InsuranceDatabase with {len(self.insurance_entries)} entries>"
 
     
 # Example Usage
 if __name__ == "__main__":
-    db = InsuranceData()
+    db = InsuranceData(stream=True)
     db.print_summary()
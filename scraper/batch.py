@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import Counter
+from config import OUTPUT_FILE, BACKEND, BATCH_MAX_AGE_DAYS
+from logger.logger import logger, start_logging
+from main import InsuranceScraper, is_retryable
+from scraper.plates import normalize_plate
+
+DAY = 86400
+CELL_SEPARATORS = re.compile(r"[,;\t|]")
+
+
+def read_plates(lines, column=None):
+    """Yields (line, plate or None) for every non-blank line of a plain list or a CSV.
+
+    With no ``column`` the first cell that is a plate number is used, so fleet
+    exports work whatever column the plate is in (a header row counts as invalid).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        cells = [cell.strip().strip('"') for cell in CELL_SEPARATORS.split(line)]
+        if column is not None:
+            yield line, normalize_plate(cells[column]) if column < len(cells) else None
+        else:
+            yield line, next(filter(None, map(normalize_plate, cells)), None)
+
+
+class BatchScraper(InsuranceScraper):
+    """InsuranceScraper for a given list of plates, streaming each result to a sink as it completes.
+
+    Only the records of the requested plates are kept from the store, which is
+    streamed once; plates whose stored result is younger than ``max_age`` are
+    answered from it instead of being scraped again.
+    """
+
+    def __init__(self, plates, sink, output_file=OUTPUT_FILE, concurrency=5, max_age=BATCH_MAX_AGE_DAYS * DAY,
+                 **kwargs):
+        self.targets = dict.fromkeys(plates)  # Normalized and deduplicated, in input order
+        self.sink = sink
+        self.max_age = max_age
+        self.scraped_at = {}
+        self.summary = Counter()
+        regions = sorted({plate[:-5] for plate in self.targets})
+        super().__init__(output_file, concurrency, regions, **kwargs)  # Batch results update the crawl's totals
+        now = time.time()
+        self.pending = []
+        for plate in self.targets:
+            result = self.results.get(plate)
+            if result is not None and not is_retryable(result) and now - self.scraped_at.get(plate, 0) < max_age:
+                self.emit(plate, result, "store")
+                self.summary["fresh"] += 1
+            else:
+                self.pending.append(plate)
+
+    def load_existing_data(self):
+        """Streams the store once and keeps only the requested plates' latest records."""
+        self.attempts = {}  # The crawl's pending retries are not part of the batch
+        results = {}
+        for record in self.journal.replay_records():
+            plate = record["plate"]
+            if plate in self.targets:
+                results[plate] = record["result"]
+                self.scraped_at[plate] = record.get("scraped_at", 0)
+        return results
+
+    def emit(self, plate, result, source):
+        record = {"plate": plate, "result": result, "source": source, "scraped_at": self.scraped_at.get(plate)}
+        self.sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.sink.flush()
+
+    def pending_indices(self, start=0):
+        """Yields the plates still to scrape, in input order."""
+        for plate in self.pending:
+            if self.pool.stopping:
+                return
+            yield self.plate_space.encode(plate)
+
+    async def scrape_index(self, index, page):
+        plate = self.plate_space.decode(index)
+        try:
+            await super().scrape_index(index, page)
+        finally:
+            if plate not in self.attempts:  # Done, or out of retries
+                result = self.results.get(plate)
+                self.scraped_at[plate] = int(time.time())
+                self.emit(plate, result, "live")
+                self.summary["scraped"] += 1
+                self.summary["found" if isinstance(result, dict) else result or "failed"] += 1
+
+    def checkpoint_cursor(self):
+        pass  # The cursor belongs to the full crawl and must not move
+
+    def finish(self):
+        """Persists this batch's records without compacting the whole store."""
+        self.close_bitmap()
+        self.journal.close()
+        if self.parquet:
+            self.parquet.export()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape a list of plates (one per line, or a CSV) and stream the "
+                                                 "results as JSON lines.")
+    parser.add_argument("input", nargs="?", default="-", help="plate list or CSV file ('-' for stdin)")
+    parser.add_argument("--column", type=int, help="CSV column holding the plate (0-based; default: detect)")
+    parser.add_argument("--results", default="-", help="where to write the JSON lines ('-' for stdout)")
+    parser.add_argument("--max-age-days", type=float, default=BATCH_MAX_AGE_DAYS,
+                        help="stored results younger than this are not scraped again")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--output", default=OUTPUT_FILE, help="result store of the crawl")
+    parser.add_argument("--backend", choices=["browser", "http"], default=BACKEND)
+    args = parser.parse_args()
+    start_logging()
+
+    started = time.monotonic()
+    summary = Counter()
+    plates = []
+    with (sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8-sig")) as lines:
+        for line, plate in read_plates(lines, args.column):
+            summary["input"] += 1
+            if plate is None:
+                summary["invalid"] += 1
+                logger.warning(f"Skipping {line!r}: no plate number")
+            else:
+                plates.append(plate)
+    summary["duplicates"] = len(plates) - len(set(plates))
+
+    with (sys.stdout if args.results == "-" else open(args.results, "w", encoding="utf-8")) as sink:
+        scraper = BatchScraper(plates, sink, args.output, args.concurrency, args.max_age_days * DAY,
+                               backend=args.backend, metrics_port=None)
+        if scraper.pending:
+            asyncio.run(scraper.run())
+        else:
+            scraper.finish()
+    summary.update(scraper.summary)
+    summary["unfinished"] = len(scraper.pending) - scraper.summary["scraped"]
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    print(json.dumps(dict(summary)), file=sys.stderr)
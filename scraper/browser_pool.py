@@ -0,0 +1,157 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import Error as PlaywrightError
+from config import WARM_PAGES, CONTEXT_MAX_REQUESTS, CONTEXT_MAX_HEAP_MB, CONTEXT_MEMORY_CHECK_INTERVAL
+from logger.logger import logger
+from scraper.page import FormPage
+
+# Playwright error messages meaning the page, its context or the whole browser is gone
+CRASH_MESSAGES = (
+    "Target page, context or browser has been closed",
+    "Target closed",
+    "Page crashed",
+    "Browser has been closed",
+    "Browser closed",
+    "Connection closed",
+)
+HEAP_JS = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+def is_crash(error):
+    """Whether an exception means the page died, as opposed to a slow or odd page."""
+    return isinstance(error, PlaywrightError) and any(message in str(error) for message in CRASH_MESSAGES)
+
+
+class PageSlot:
+    """One worker's page, in a browser context of its own that the slot renews when needed.
+
+    The context is recycled after ``max_requests`` plates or once the renderer's
+    JS heap passes the pool's limit, and replaced outright when its page or the
+    browser crashed. Workers only ever see a healthy FormPage.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.browser = None  # Browser the context was opened in
+        self.context = None
+        self.page = None
+        self.requests = 0
+        self.crashed = False
+
+    def _on_crash(self, _page=None):
+        self.crashed = True
+
+    async def open(self):
+        self.browser = await self.pool.get_browser()
+        self.context = await self.browser.new_context()
+        page = await self.context.new_page()
+        page.on("crash", self._on_crash)
+        self.page = FormPage(
+            page, self.pool.url, self.pool.page_stats, warm=self.pool.warm, metrics=self.pool.metrics,
+            timeouts=self.pool.timeouts,
+        )
+        self.requests = 0
+        self.crashed = False
+
+    async def close(self):
+        context, self.context, self.page = self.context, None, None
+        if context is not None:
+            try:
+                await context.close()
+            except PlaywrightError:
+                pass  # Already gone with its browser
+
+    async def heap_mb(self):
+        try:
+            return await self.page.page.evaluate(HEAP_JS) / 2**20
+        except PlaywrightError:
+            return 0.0  # Mid-navigation; checked again later
+
+    async def renewal_reason(self):
+        """Why the current context must be replaced before the next plate, or None."""
+        if self.crashed:
+            return "crash"
+        if self.browser is not self.pool.browser or not self.browser.is_connected():
+            return "browser"
+        if self.requests >= self.pool.max_requests:
+            return "requests"
+        interval = self.pool.memory_check_interval
+        if interval and self.requests and self.requests % interval == 0:
+            if await self.heap_mb() >= self.pool.max_heap_mb:
+                return "memory"
+        return None
+
+    async def acquire(self):
+        """Returns a healthy page for the next plate, renewing the context first if it is due."""
+        if self.page is not None:
+            reason = await self.renewal_reason()
+            if reason is not None:
+                self.pool.renewals[reason] += 1
+                await self.close()
+        if self.page is None:
+            await self.open()
+        self.requests += 1
+        return self.page
+
+    @asynccontextmanager
+    async def use(self):
+        """Yields the page for one plate; a crash under it marks the context for replacement."""
+        page = await self.acquire()
+        try:
+            yield page
+        except Exception as e:
+            if is_crash(e):
+                logger.warning(f"Page crashed ({e}), replacing its context.")
+                self.crashed = True
+            else:
+                page.invalidate()
+            raise
+
+
+class BrowserPool:
+    """Shared Chromium instance with one PageSlot per worker.
+
+    A browser that crashed or disconnected is relaunched on the next request for a
+    page; every slot notices and reopens its context in the new browser.
+    """
+
+    def __init__(self, playwright, url, page_stats, size, warm=WARM_PAGES, metrics=None, timeouts=None,
+                 max_requests=CONTEXT_MAX_REQUESTS, max_heap_mb=CONTEXT_MAX_HEAP_MB,
+                 memory_check_interval=CONTEXT_MEMORY_CHECK_INTERVAL):
+        self.playwright = playwright
+        self.url = url
+        self.page_stats = page_stats
+        self.warm = warm
+        self.metrics = metrics
+        self.timeouts = timeouts  # AdaptiveTimeouts shared by every page
+        self.max_requests = max_requests
+        self.max_heap_mb = max_heap_mb
+        self.memory_check_interval = memory_check_interval
+        self.browser = None
+        self.launches = 0
+        self.renewals = dict.fromkeys(("requests", "memory", "crash", "browser"), 0)
+        self.slots = [PageSlot(self) for _ in range(size)]
+        self._launch_lock = asyncio.Lock()
+
+    async def get_browser(self):
+        """Returns the running browser, launching a new one if there is none or it died."""
+        async with self._launch_lock:
+            if self.browser is None or not self.browser.is_connected():
+                if self.browser is not None:
+                    logger.warning("Browser disconnected, relaunching.")
+                self.browser = await self.playwright.chromium.launch(headless=True)
+                self.launches += 1
+            return self.browser
+
+    async def close(self):
+        for slot in self.slots:
+            await slot.close()
+        if self.browser is not None and self.browser.is_connected():
+            await self.browser.close()
+        self.browser = None
+
+    def stats(self):
+        return {
+            "browser_launches": self.launches,
+            **{f"context_renewals_{reason}": count for reason, count in self.renewals.items()},
+        }
@@ -0,0 +1,90 @@
+import asyncio
+from collections import deque
+from config import MIN_CONCURRENCY, MAX_CONCURRENCY, TARGET_P95_LATENCY, TARGET_TIMEOUT_RATE
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list (0.0 for an empty one)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for how many pages may work at once.
+
+    Workers ``acquire()`` a slot before each plate and ``release()`` it after. Every
+    ``adjust_every`` samples the limit grows by one while p95 latency and the timeout
+    rate stay under their targets. It is multiplied by ``decrease_factor`` on the
+    first sample that takes either over, once the window holds ``cooldown`` samples
+    taken since the last decrease.
+    """
+
+    def __init__(self, initial=5, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY,
+                 target_p95=TARGET_P95_LATENCY, target_timeout_rate=TARGET_TIMEOUT_RATE,
+                 window=100, adjust_every=20, decrease_factor=0.5, cooldown=10):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.target_p95 = target_p95
+        self.target_timeout_rate = target_timeout_rate
+        self.adjust_every = adjust_every
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.samples = deque(maxlen=window)  # (latency seconds, timed out)
+        self.active = 0
+        self.since_adjust = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def record(self, latency, timed_out):
+        """Adds one plate's latency and whether it timed out; cuts the limit on a breach, grows it periodically."""
+        self.samples.append((latency, timed_out))
+        self.since_adjust += 1
+        if len(self.samples) >= self.cooldown and self.breached():
+            self.decrease()
+        elif self.since_adjust >= self.adjust_every:
+            self.adjust()
+
+    def p95(self):
+        return percentile([latency for latency, _ in self.samples], 0.95) if self.samples else 0.0
+
+    def timeout_rate(self):
+        return sum(timed_out for _, timed_out in self.samples) / len(self.samples) if self.samples else 0.0
+
+    def breached(self):
+        return self.p95() > self.target_p95 or self.timeout_rate() > self.target_timeout_rate
+
+    def adjust(self):
+        self.since_adjust = 0
+        if self.breached():
+            self.decrease()
+        elif self.limit < self.maximum:
+            self.limit += 1
+            asyncio.get_running_loop().create_task(self._wake())
+
+    def decrease(self):
+        self.since_adjust = 0
+        self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+        self.samples.clear()  # Judge the new level on fresh samples only
+
+    async def _wake(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def stats(self):
+        return {
+            "concurrency_limit": self.limit,
+            "p95_latency": round(self.p95(), 2),
+            "timeout_rate": round(self.timeout_rate(), 3),
+        }
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import glob
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from config import (
+    TARGET_URL, OUTPUT_FILE, PLATE_REGIONS, SHARD_QUEUE_FILE, SHARD_LEASE_SECONDS, PARQUET_EXPORT, STATS_FILE, LOG_FILE,
+)
+from logger.logger import logger, start_logging, use_log_file
+from main import InsuranceScraper, result_state
+from scraper.plates import PlateSpace, NUMBERS_PER_BLOCK
+from storage.journal import ResultJournal, journal_path
+from storage.parquet import ParquetExporter, dataset_path
+from storage.bitmap import CompletionBitmap, bitmap_path, STATE_EMPTY
+
+
+class ShardQueue:
+    """Lease-based work queue of plate-space shards (one per region + letter pair) in SQLite.
+
+    A shard is leased to one worker at a time. Leases are renewed while the worker
+    makes progress; an expired lease (crashed worker) makes the shard claimable
+    again. The database uses the rollback journal rather than WAL so that several
+    hosts can share it over network storage. Every call opens its own connection,
+    so the queue is safe to use from any thread or process.
+    """
+
+    def __init__(self, queue_file=SHARD_QUEUE_FILE):
+        self.queue_file = queue_file
+        os.makedirs(os.path.dirname(queue_file) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS shards ("
+                " prefix TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL DEFAULT 'pending',"  # pending / leased / done
+                " owner TEXT,"
+                " lease_expires REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, owner TEXT, expires REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.queue_file, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=DELETE")
+            yield db
+        finally:
+            db.close()
+
+    def seed(self, plate_space):
+        """Adds one shard per block of the plate space; existing shards are left alone."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT OR IGNORE INTO shards (prefix) VALUES (?)",
+                ((plate_space.block_prefix(block),) for block in plate_space.blocks()),
+            )
+            db.execute("COMMIT")
+
+    def claim(self, owner, lease_seconds=SHARD_LEASE_SECONDS):
+        """Leases the next pending (or abandoned) shard to ``owner``; returns its prefix or None."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT prefix FROM shards WHERE state = 'pending'"
+                " OR (state = 'leased' AND lease_expires < ?) ORDER BY rowid LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE shards SET state = 'leased', owner = ?, lease_expires = ?,"
+                    " attempts = attempts + 1 WHERE prefix = ?",
+                    (owner, now + lease_seconds, row[0]),
+                )
+            db.execute("COMMIT")
+        return row[0] if row else None
+
+    def renew(self, prefixes, owner, lease_seconds=SHARD_LEASE_SECONDS):
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE shards SET lease_expires = ? WHERE prefix = ? AND owner = ? AND state = 'leased'",
+                ((time.time() + lease_seconds, prefix, owner) for prefix in prefixes),
+            )
+
+    def complete(self, prefix, owner):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE shards SET state = 'done', lease_expires = NULL WHERE prefix = ? AND owner = ?",
+                (prefix, owner),
+            )
+
+    def release(self, prefixes, owner):
+        """Hands unfinished shards back to the queue (e.g. on a graceful shutdown)."""
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE shards SET state = 'pending', owner = NULL, lease_expires = NULL"
+                " WHERE prefix = ? AND owner = ? AND state = 'leased'",
+                ((prefix, owner) for prefix in prefixes),
+            )
+
+    def progress(self):
+        """Returns shard counts per state."""
+        with self._connect() as db:
+            return dict(db.execute("SELECT state, COUNT(*) FROM shards GROUP BY state").fetchall())
+
+    def try_lock(self, name, owner, seconds):
+        """Takes a named lease (e.g. for the merge step) unless another owner holds a live one."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT owner, expires FROM locks WHERE name = ?", (name,)).fetchone()
+            taken = row is None or row[0] == owner or row[1] < now
+            if taken:
+                db.execute(
+                    "INSERT OR REPLACE INTO locks (name, owner, expires) VALUES (?, ?, ?)",
+                    (name, owner, now + seconds),
+                )
+            db.execute("COMMIT")
+        return taken
+
+    def unlock(self, name, owner):
+        with self._connect() as db:
+            db.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+def segment_dir(output_file):
+    return os.path.join(os.path.dirname(output_file) or ".", "segments")
+
+
+def owner_path(path, owner):
+    """Tags a file name with a worker owner (logs/scraper.log -> logs/scraper.host-123.log)."""
+    name, ext = os.path.splitext(path)
+    safe_owner = owner.replace(":", "-").replace(os.sep, "-")
+    return f"{name}.{safe_owner}{ext}"
+
+
+def segment_path(output_file, owner):
+    """Per-worker snapshot path; its journal (.jsonl) is the worker's result segment."""
+    return owner_path(os.path.join(segment_dir(output_file), os.path.basename(output_file)), owner)
+
+
+def segment_journals(output_file):
+    name, _ = os.path.splitext(os.path.basename(output_file))
+    return sorted(glob.glob(os.path.join(segment_dir(output_file), f"{name}.*.jsonl")))
+
+
+def segment_snapshot(segment, output_file):
+    """The snapshot path a segment journal belongs to (segments/data.host-1.jsonl -> segments/data.host-1.json)."""
+    return os.path.splitext(segment)[0] + os.path.splitext(output_file)[1]
+
+
+def merge_segments(output_file=OUTPUT_FILE, regions=PLATE_REGIONS):
+    """Folds every worker segment into the main journal and refreshes the JSON snapshot.
+
+    The main bitmap and aggregates are rebuilt from the compacted journal here,
+    so neither the next run nor the next crawl's workers have to replay it.
+    """
+    journal = ResultJournal(journal_path(output_file))
+    segments = segment_journals(output_file)
+    for segment in segments:
+        for record in ResultJournal(segment).replay_records():
+            journal.append(record.pop("plate"), record.pop("result"), **record)
+    exporter = ParquetExporter(dataset_path(output_file), journal.journal_file) if PARQUET_EXPORT else None
+    if exporter:
+        journal.close()
+        exporter.export()
+    results = journal.compact(output_file)
+    if exporter:
+        exporter.mark_exported()
+    InsuranceScraper(output_file, regions=regions, metrics_port=None, parquet=False, store="journal").close_bitmap()
+    for segment in segments:
+        for path in glob.glob(os.path.splitext(segment)[0] + ".*"):
+            os.remove(path)
+    logger.info(f"Merged {len(segments)} segments into {output_file} ({len(results)} records)")
+    return results
+
+
+class ShardedScraper(InsuranceScraper):
+    """InsuranceScraper that crawls shards leased from a ShardQueue into its own result segment."""
+
+    def __init__(self, queue_file=SHARD_QUEUE_FILE, output_file=OUTPUT_FILE, concurrency=5,
+                 regions=PLATE_REGIONS, lease_seconds=SHARD_LEASE_SECONDS, **kwargs):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.shard_queue = ShardQueue(queue_file)
+        self.lease_seconds = lease_seconds
+        self.leased = {}  # block -> prefix of every shard this worker holds
+        self.exhausted = set()  # Leased blocks whose plates have all been dispatched
+        super().__init__(segment_path(output_file, self.owner), concurrency, regions, **kwargs)
+        self.stats_file = owner_path(STATS_FILE, self.owner)  # Workers must not overwrite each other's
+        # Skip plates sitting in other (possibly crashed) workers' segments or already merged, newest first
+        for segment in segment_journals(output_file):
+            snapshot = segment_snapshot(segment, output_file)
+            if snapshot != self.output_file:
+                self.seed_bitmap(snapshot)
+        self.seed_bitmap(output_file)
+
+    def seed_bitmap(self, snapshot_file):
+        """Marks the plates done in another bitmap and its journal, unless this bitmap has them already.
+
+        Only the records written after that bitmap's last checkpoint are read;
+        the whole journal only if it has no usable bitmap.
+        """
+        journal = ResultJournal(journal_path(snapshot_file))
+        other = CompletionBitmap(bitmap_path(snapshot_file))
+        try:
+            meta = other.load()
+            records = journal.records_since(meta["store"]) if meta else None
+            seeded = records is not None
+            latest = {
+                record["plate"]: result_state(record["result"])
+                for record in (records if seeded else journal.replay_records())
+            }
+            latest = {plate: state for plate, state in latest.items() if self.bitmap.get(plate) == STATE_EMPTY}
+            if seeded:
+                self.bitmap.update(other)
+            for plate, state in latest.items():
+                self.bitmap.set(plate, state)  # Newer than the other bitmap's bits
+        finally:
+            other.close()
+
+    def pending_indices(self, start=0):
+        """Yields plate indices shard by shard, claiming the next shard when one runs out."""
+        while not self.pool.stopping:
+            prefix = self.shard_queue.claim(self.owner, self.lease_seconds)
+            if prefix is None:
+                return
+            block = self.plate_space.encode(prefix + "001") // NUMBERS_PER_BLOCK
+            self.leased[block] = prefix
+            logger.info(f"{self.owner} leased shard {prefix}")
+            for index in range(block * NUMBERS_PER_BLOCK, (block + 1) * NUMBERS_PER_BLOCK):
+                if not self.is_done(self.plate_space.decode(index)):
+                    yield index
+            self.exhausted.add(block)
+            self.complete_shards()
+
+    def complete_shards(self):
+        """Marks fully dispatched shards done once none of their plates is unfinished or waiting for a retry."""
+        busy = {index // NUMBERS_PER_BLOCK for index in (*self.pool.unfinished, *self.retries.items())}
+        for block in list(self.exhausted - busy):
+            self.exhausted.discard(block)
+            # Only after the journal holds the shard's results
+            self.journal.checkpoint(self.shard_queue.complete, self.leased.pop(block), self.owner)
+
+    def report_progress(self, stats):
+        logger.info(f"Progress ({self.owner}): {self.collect_stats(stats)}")
+        self.complete_shards()
+        self.shard_queue.renew(self.leased.values(), self.owner, self.lease_seconds)
+        self.checkpoint_bitmap()
+
+    def finish(self):
+        self.complete_shards()
+        self.close_bitmap()
+        self.journal.close()
+        if self.leased:
+            self.shard_queue.release(self.leased.values(), self.owner)
+
+
+def run_worker(queue_file, output_file, concurrency, regions, backend, url):
+    use_log_file(owner_path(LOG_FILE, f"{socket.gethostname()}:{os.getpid()}"))
+    # One metrics endpoint per host port: the workers report through their logs and stats files instead
+    scraper = ShardedScraper(
+        queue_file, output_file, concurrency, regions, backend=backend, url=url, metrics_port=None
+    )
+    asyncio.run(scraper.run())
+
+
+def crawl(workers=None, concurrency=5, queue_file=SHARD_QUEUE_FILE, output_file=OUTPUT_FILE,
+          regions=PLATE_REGIONS, backend="browser", url=TARGET_URL):
+    """Seeds the shard queue, runs worker processes until it is drained, then merges their results."""
+    workers = workers or os.cpu_count()
+    shard_queue = ShardQueue(queue_file)
+    shard_queue.seed(PlateSpace(regions))
+    logger.info(f"Shards: {shard_queue.progress()}, starting {workers} workers")
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(queue_file, output_file, concurrency, regions, backend, url))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        while process.is_alive():
+            try:
+                process.join()
+            except KeyboardInterrupt:
+                pass  # Workers got the signal too and are draining
+
+    progress = shard_queue.progress()
+    logger.info(f"Workers finished, shards: {progress}")
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if set(progress) <= {"done"} and shard_queue.try_lock("merge", owner, 3600):
+        try:
+            merge_segments(output_file, regions)
+        finally:
+            shard_queue.unlock("merge", owner)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the plate space with several worker processes.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=5, help="pages per worker")
+    parser.add_argument("--queue", default=SHARD_QUEUE_FILE, help="shard queue file, may live on shared storage")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--regions", nargs="+", default=PLATE_REGIONS)
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser")
+    parser.add_argument("--url", default=TARGET_URL, help="checkValidity page to scrape (e.g. a local mock)")
+    parser.add_argument("--merge-only", action="store_true", help="only merge worker segments")
+    args = parser.parse_args()
+    start_logging()
+
+    if args.merge_only:
+        merge_segments(args.output, args.regions)
+    else:
+        crawl(args.workers, args.concurrency, args.queue, args.output, args.regions, args.backend, args.url)
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+from collections import Counter
+from itertools import islice
+from config import (
+    OUTPUT_FILE, PLATE_REGIONS, BACKEND, DENSITY_SAMPLE_SIZE, DENSITY_RECALL_TARGET, DENSITY_PRIOR_STRENGTH,
+)
+from logger.logger import logger, start_logging
+from main import InsuranceScraper, is_retryable
+from scraper.plates import LETTER_PAIRS, NUMBERS_PER_BLOCK
+from storage.bitmap import STATE_DONE, STATE_FOUND
+
+
+class DensityPlanner:
+    """Orders and prunes the crawl by the estimated policy density of each letter-pair block.
+
+    Every block is first probed with ``sample_size`` evenly spaced plates. Blocks
+    are then scanned densest first, re-estimating after each one, until the
+    scanned blocks are expected to hold ``recall_target`` of all policies in the
+    plate space. A block's density is its hit rate shrunk towards the global rate
+    (``prior_strength`` pseudo-probes), so a handful of probes can't zero it out.
+    """
+
+    def __init__(self, plate_space, sample_size=DENSITY_SAMPLE_SIZE, recall_target=DENSITY_RECALL_TARGET,
+                 prior_strength=DENSITY_PRIOR_STRENGTH):
+        self.plate_space = plate_space
+        self.sample_size = sample_size
+        self.recall_target = recall_target
+        self.prior_strength = prior_strength
+        self.hits = Counter()  # Block -> plates with a policy
+        self.probes = Counter()  # Block -> plates with a definite answer
+        self.total_hits = 0
+        self.total_probes = 0
+        self.blocks = list(plate_space.blocks())
+        self.sizes = {block: plate_space.block_size(block) for block in self.blocks}
+        self.dispatched = set()  # Blocks released for a full scan
+        self.probing = set()  # Probe indices dispatched but not answered yet, which the scan must not dispatch again
+        self.phase = "probe"
+        self.coverage = 0.0
+
+    def observe(self, plate_number, result):
+        """Counts a result towards its block's density; failed lookups say nothing about it."""
+        if result is None:
+            return  # Re-queued, still in flight
+        index = self.plate_space.encode(plate_number)
+        self.probing.discard(index)
+        if is_retryable(result):
+            return
+        self.observe_counts(index // NUMBERS_PER_BLOCK, 1, int(isinstance(result, dict)))
+
+    def observe_counts(self, block, probes, hits):
+        """Counts ``probes`` definite answers, ``hits`` of them policies, towards a block's density."""
+        self.probes[block] += probes
+        self.hits[block] += hits
+        self.total_probes += probes
+        self.total_hits += hits
+
+    def density(self, block):
+        global_rate = (self.total_hits + 1) / (self.total_probes + 2)
+        return (self.hits[block] + self.prior_strength * global_rate) / (self.probes[block] + self.prior_strength)
+
+    def expected_hits(self, block):
+        """Policies found in the block so far plus those expected among its unanswered plates."""
+        unanswered = max(self.sizes[block] - self.probes[block], 0)
+        return self.hits[block] + self.density(block) * unanswered
+
+    def sample(self, block, is_done=lambda index: False):
+        """Evenly spaced probe plates for a block, only as many not yet done as it still needs."""
+        indices = list(self.plate_space.block_indices(block))
+        needed = self.sample_size - self.probes[block]
+        if needed <= 0 or not indices:
+            return []
+        count = min(self.sample_size, len(indices))
+        step = len(indices) / count
+        spaced = (indices[int(step * k + step / 2)] for k in range(count))
+        return list(islice((index for index in spaced if not is_done(index)), needed))
+
+    def estimate(self):
+        """Returns (expected share of all policies in dispatched blocks, expected hits per block)."""
+        expected = {block: self.expected_hits(block) for block in self.blocks}
+        total = sum(expected.values())
+        covered = sum(expected[block] for block in self.dispatched)
+        return (covered / total if total else 1.0), expected
+
+    def indices(self, is_done):
+        """Yields probe plates for every block, then whole blocks by density until the recall target."""
+        for block in self.blocks:
+            for index in self.sample(block, is_done):
+                self.probing.add(index)
+                yield index
+
+        self.phase = "scan"
+        while True:
+            self.coverage, _ = self.estimate()
+            remaining = [block for block in self.blocks if block not in self.dispatched]
+            if not remaining or self.coverage >= self.recall_target:
+                break
+            block = max(remaining, key=self.density)
+            self.dispatched.add(block)
+            for index in self.plate_space.block_indices(block):
+                if not is_done(index) and index not in self.probing:
+                    yield index
+        self.phase = "done"
+        logger.info(f"Density plan finished: {self.stats()}")
+
+    def stats(self):
+        coverage, expected = self.estimate()
+        skipped = [block for block in self.blocks if block not in self.dispatched]
+        return {
+            "density_phase": self.phase,
+            "blocks_scanned": len(self.dispatched),
+            "blocks_skipped": len(skipped) if self.phase == "done" else 0,
+            "estimated_coverage": round(coverage, 4),
+            "estimated_policies_given_up": round(sum(expected[block] for block in skipped)) if self.phase == "done" else 0,
+        }
+
+
+class DensityScraper(InsuranceScraper):
+    """InsuranceScraper that crawls in DensityPlanner order and skips the sparsest blocks."""
+
+    def __init__(self, output_file=OUTPUT_FILE, concurrency=5, regions=PLATE_REGIONS, sample_size=DENSITY_SAMPLE_SIZE,
+                 recall_target=DENSITY_RECALL_TARGET, prior_strength=DENSITY_PRIOR_STRENGTH, **kwargs):
+        super().__init__(output_file, concurrency, regions, **kwargs)
+        self.planner = DensityPlanner(self.plate_space, sample_size, recall_target, prior_strength)
+        for block in range(len(self.plate_space.regions) * len(LETTER_PAIRS)):  # Every block of the regions
+            counts = self.bitmap.block_counts(self.plate_space.block_prefix(block))
+            if counts[STATE_DONE] or counts[STATE_FOUND]:
+                self.planner.observe_counts(block, counts[STATE_DONE] + counts[STATE_FOUND], counts[STATE_FOUND])
+
+    def pending_indices(self, start=0):
+        """Yields plates in planner order; results so far (this run's too) steer it."""
+        return self.planner.indices(lambda index: self.is_done(self.plate_space.decode(index)))
+
+    async def scrape_index(self, index, page):
+        await super().scrape_index(index, page)
+        plate = self.plate_space.decode(index)
+        self.planner.observe(plate, self.results.get(plate))
+
+    def checkpoint_cursor(self):
+        pass  # Blocks are visited out of order, so there is no watermark to save
+
+    def collect_stats(self, stats):
+        stats = super().collect_stats(stats)
+        stats.update(self.planner.stats())
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the densest letter-pair blocks first and skip sparse ones.")
+    parser.add_argument("--sample-size", type=int, default=DENSITY_SAMPLE_SIZE, help="probe plates per block")
+    parser.add_argument("--recall", type=float, default=DENSITY_RECALL_TARGET,
+                        help="expected share of all policies to reach before stopping (1.0 scans everything)")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--regions", nargs="+", default=PLATE_REGIONS)
+    parser.add_argument("--backend", choices=["browser", "http"], default=BACKEND)
+    args = parser.parse_args()
+    start_logging()
+
+    scraper = DensityScraper(args.output, args.concurrency, args.regions, args.sample_size, args.recall,
+                             backend=args.backend)
+    asyncio.run(scraper.run())
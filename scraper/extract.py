@@ -0,0 +1,28 @@
+from models.models import RESULT_FIELDS
+
+# Every row of the result table as a list of trimmed cell texts, in one evaluation
+EXTRACT_ROWS_JS = """
+() => [...document.querySelectorAll(".result-area tbody tr")].map(
+    (row) => [...row.querySelectorAll("td")].map((td) => td.innerText.trim())
+)
+"""
+
+
+def rows_to_result(rows):
+    """Maps result table rows to the stored value for a plate, or None if no row is complete.
+
+    The first policy's fields are stored at the top level, as before. When the site
+    returns more than one policy, all of them are kept under "Policies".
+    """
+    policies = [dict(zip(RESULT_FIELDS, cells)) for cells in rows if len(cells) >= len(RESULT_FIELDS)]
+    if not policies:
+        return None
+    result = dict(policies[0])
+    if len(policies) > 1:
+        result["Policies"] = policies
+    return result
+
+
+async def extract_result(page):
+    """Reads the whole result table from the page and maps it with rows_to_result()."""
+    return rows_to_result(await page.evaluate(EXTRACT_ROWS_JS))
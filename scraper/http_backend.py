@@ -0,0 +1,215 @@
+import asyncio
+import http.client
+import queue
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlencode, urlsplit
+from config import TARGET_URL, HTTP_TIMEOUT
+from scraper.extract import rows_to_result
+
+NOT_FOUND_TEXT = "Məlumat tapılmadı"
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+
+
+class StaleStateError(Exception):
+    """The form postback was not accepted (expired ASP.NET state, redirect, unexpected page)."""
+
+
+class FormPageParser(HTMLParser):
+    """Pulls the form state, the #divError text and the .result-area tbody rows out of a page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}  # Hidden inputs (__VIEWSTATE, __EVENTVALIDATION, ...)
+        self.button = None  # (name, value) of #pageBody_btnCheck
+        self.error_text = ""
+        self.has_result_table = False
+        self.rows = []
+        self._stack = []
+        self._error_depth = None
+        self._result_depth = None
+        self._tbody_depth = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input":
+            if attrs.get("type", "").lower() == "hidden" and attrs.get("name"):
+                self.fields[attrs["name"]] = attrs.get("value", "")
+            elif attrs.get("id") == "pageBody_btnCheck" and attrs.get("name"):
+                self.button = (attrs["name"], attrs.get("value", ""))
+        if tag == "button" and attrs.get("id") == "pageBody_btnCheck" and attrs.get("name"):
+            self.button = (attrs["name"], attrs.get("value", ""))
+        if tag in VOID_TAGS:
+            return
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if attrs.get("id") == "divError":
+            self._error_depth = depth
+        if "result-area" in (attrs.get("class") or "").split():
+            self._result_depth = depth
+        if tag == "tbody" and self._result_depth is not None:
+            self._tbody_depth = depth
+            self.has_result_table = True
+        if self._tbody_depth is not None:
+            if tag == "tr":
+                self.rows.append([])
+            elif tag == "td" and self.rows:
+                self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or tag not in self._stack:
+            return
+        # Pop up to the matching tag so unclosed children don't break depth tracking
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            if closed == "td" and self._cell is not None and self.rows:
+                self.rows[-1].append(" ".join("".join(self._cell).split()))
+                self._cell = None
+            if depth == self._tbody_depth:
+                self._tbody_depth = None
+            if depth == self._result_depth:
+                self._result_depth = None
+            if depth == self._error_depth:
+                self._error_depth = None
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        if self._error_depth is not None:
+            self.error_text += data
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_result(html):
+    """Maps a result page onto the scraper's result model, or raises StaleStateError."""
+    parser = FormPageParser()
+    parser.feed(html)
+    parser.close()
+    result = rows_to_result(parser.rows)
+    if result is not None:
+        return result, parser
+    if NOT_FOUND_TEXT in parser.error_text:
+        return "Not Found", parser
+    if parser.has_result_table:
+        return "No Data", parser
+    raise StaleStateError("Response has neither a result table nor the not-found message")
+
+
+class _Session:
+    """One keep-alive connection with its own cookies and form state."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.conn = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.cookies = {}
+        self.fields = None
+        self.button = None
+
+    def set_timeout(self, timeout):
+        """Applies a socket timeout (seconds) to this and later requests on the connection."""
+        self.conn.timeout = timeout
+        if self.conn.sock is not None:
+            self.conn.sock.settimeout(timeout)
+
+    def request(self, method, body=None):
+        headers = {"Connection": "keep-alive", "User-Agent": "Mozilla/5.0"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in range(2):
+            try:
+                self.conn.request(method, self.path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                html = response.read().decode("utf-8", errors="replace")
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server dropped the idle keep-alive connection; reconnect once
+                self.conn.close()
+                if attempt:
+                    raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            name, _, value = header.split(";", 1)[0].partition("=")
+            self.cookies[name.strip()] = value.strip()
+        if response.status != 200:
+            raise StaleStateError(f"HTTP {response.status} from {method} {self.path}")
+        return html
+
+    def load_form(self):
+        parser = FormPageParser()
+        parser.feed(self.request("GET"))
+        if not parser.fields or parser.button is None:
+            raise StaleStateError("Form page is missing its ASP.NET state fields")
+        self.fields, self.button = parser.fields, parser.button
+
+    def submit(self, plate_number):
+        form = dict(self.fields)
+        form["carNumber"] = plate_number
+        form[self.button[0]] = self.button[1]
+        result, parser = parse_result(self.request("POST", urlencode(form)))
+        if parser.fields:
+            self.fields = parser.fields  # The postback re-renders fresh state tokens
+        return result
+
+    def lookup(self, plate_number):
+        if self.fields is None:
+            self.load_form()
+        try:
+            return self.submit(plate_number)
+        except StaleStateError:
+            # Tokens may have expired: reload the form once before giving up
+            self.load_form()
+            return self.submit(plate_number)
+
+
+class HttpBackend:
+    """Looks plates up by replaying the checkValidity form postback over pooled HTTP connections.
+
+    Returns the same result values as the Playwright path ("Not Found", "No Data",
+    "Timeout" or the row dict) and raises StaleStateError when the postback cannot
+    be made to work, so the caller can fall back to the browser.
+    """
+
+    def __init__(self, url=TARGET_URL, pool_size=5, timeout=HTTP_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.sessions = queue.LifoQueue()  # LIFO keeps the warmest connections busy
+        for _ in range(pool_size):
+            self.sessions.put(_Session(url, timeout))
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="http-backend")
+
+    def _lookup(self, plate_number, timeout):
+        session = self.sessions.get()
+        try:
+            session.set_timeout(self.timeout if timeout is None else max(timeout, 0.001))
+            return session.lookup(plate_number)
+        except (socket.timeout, TimeoutError):
+            session.conn.close()
+            return "Timeout"
+        except (OSError, http.client.HTTPException) as e:
+            session.conn.close()
+            raise StaleStateError(f"Connection error: {e}") from e
+        finally:
+            self.sessions.put(session)
+
+    async def lookup(self, plate_number, timeout=None):
+        """Returns the result for one plate without blocking the event loop.
+
+        ``timeout`` (seconds) overrides the backend's socket timeout for this plate.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._lookup, plate_number, timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self.sessions.empty():
+            self.sessions.get().conn.close()
@@ -0,0 +1,172 @@
+import asyncio
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from config import METRICS_HOST, METRICS_PORT
+from logger.logger import logger
+
+# Where time goes for one plate: browser phases, the HTTP backend, the journal, and the whole plate
+PHASES = ("goto", "fill", "click", "outcome_wait", "extract", "http_lookup", "save", "plate")
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds), Prometheus style."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation; the largest one seen past the last bucket."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return round(self.max, 4)  # Not +Inf, which stats.json could not hold
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    """Per-phase timings and per-outcome counters for a run.
+
+    ``gauges`` is a callable returning the live run stats (plates/sec, in-flight,
+    concurrency limit, ...); they are exported as gauges next to the histograms.
+    """
+
+    def __init__(self, gauges=None):
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.outcomes = Counter()
+        self.gauges = gauges or dict
+
+    @contextmanager
+    def time(self, phase):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[phase].observe(time.monotonic() - started)
+
+    def count_outcome(self, outcome):
+        self.outcomes[outcome] += 1
+
+    def snapshot(self):
+        return {
+            "stats": self.gauges(),
+            "outcomes": dict(self.outcomes),
+            "phases": {phase: histogram.summary() for phase, histogram in self.phases.items() if histogram.count},
+        }
+
+    def prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP scraper_phase_seconds Time spent per scrape phase.",
+            "# TYPE scraper_phase_seconds histogram",
+        ]
+        for phase, histogram in self.phases.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'scraper_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'scraper_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+            lines.append(f'scraper_phase_seconds_sum{{phase="{phase}"}} {histogram.sum}')
+            lines.append(f'scraper_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        lines += ["# HELP scraper_outcomes_total Plates per outcome.", "# TYPE scraper_outcomes_total counter"]
+        for outcome, count in self.outcomes.items():
+            lines.append(f'scraper_outcomes_total{{outcome="{outcome}"}} {count}')
+        for name, value in self.gauges().items():
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE scraper_{name} gauge")
+                lines.append(f"scraper_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, stats_file):
+        """Writes the JSON snapshot atomically so readers never see a partial file."""
+        os.makedirs(os.path.dirname(stats_file) or ".", exist_ok=True)
+        tmp_file = stats_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, stats_file)
+
+
+async def serve_metrics(metrics, host=METRICS_HOST, port=METRICS_PORT):
+    """Serves /metrics (Prometheus text) and /stats (JSON) on a local port."""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+            parts = request_line.split()
+            path = parts[1].decode() if len(parts) > 1 else "/"
+            if path == "/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4", metrics.prometheus()
+            elif path == "/stats":
+                status, content_type = "200 OK", "application/json"
+                body = json.dumps(metrics.snapshot(), ensure_ascii=False)
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "Not Found\n"
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Metrics on http://{host}:{port}/metrics")
+    return server
+
+
+class RunProfiler:
+    """cProfile plus tracemalloc for one run; results are written next to the output file."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        tracemalloc.start(25)
+        self.profile.enable()
+
+    def stats(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {"traced_memory_mb": round(current / 2**20, 1), "traced_peak_mb": round(peak / 2**20, 1)}
+
+    def stop(self):
+        self.profile.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile_file = os.path.join(self.output_dir, "profile.prof")
+        self.profile.dump_stats(profile_file)
+        memory_file = os.path.join(self.output_dir, "memory_top.txt")
+        with open(memory_file, "w", encoding="utf-8") as f:
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:30]:
+                f.write(f"{stat}\n")
+        tracemalloc.stop()
+        logger.info(f"Profile written to {profile_file} and {memory_file}")
@@ -0,0 +1,37 @@
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from config import OUTCOME_TIMEOUT
+
+# Outcomes; the non-found ones double as the values stored for a plate
+FOUND = "Found"
+NOT_FOUND = "Not Found"
+NO_DATA = "No Data"
+TIMEOUT = "Timeout"
+
+# Resolves as soon as either the not-found message or the result table shows up
+OUTCOME_JS = """
+() => {
+    const visible = (el) => !!el && el.getClientRects().length > 0;
+    const error = document.querySelector("#divError");
+    if (visible(error) && error.innerText.includes("Məlumat tapılmadı")) return "Not Found";
+    const tbody = document.querySelector(".result-area tbody");
+    if (tbody) {
+        const rows = [...tbody.querySelectorAll("tr")];
+        if (rows.some((row) => row.querySelectorAll("td").length >= 5)) return "Found";
+        if (rows.length) return "No Data";
+    }
+    return null;
+}
+"""
+
+
+async def detect_outcome(page, timeout=OUTCOME_TIMEOUT):
+    """Waits once for whichever outcome appears first after submitting a plate.
+
+    Returns FOUND, NOT_FOUND, NO_DATA, or TIMEOUT if neither the error div nor
+    the result table showed up within ``timeout`` milliseconds.
+    """
+    try:
+        handle = await page.wait_for_function(OUTCOME_JS, timeout=timeout)
+    except PlaywrightTimeoutError:
+        return TIMEOUT
+    return await handle.json_value()
@@ -0,0 +1,134 @@
+import time
+from contextlib import contextmanager, nullcontext
+from config import WARM_PAGES, BLOCKED_RESOURCE_TYPES
+
+INPUT_SELECTOR = "input[name='carNumber']"
+BUTTON_SELECTOR = "#pageBody_btnCheck"
+
+# Clears the previous plate's outcome and fills the new plate in one round trip.
+# Returns false when the form is not on the page, i.e. the page needs a fresh goto.
+REFILL_FORM_JS = """
+(plate) => {
+    const input = document.querySelector("input[name='carNumber']");
+    if (!input || !document.querySelector("#pageBody_btnCheck")) return false;
+    document.querySelectorAll(".result-area tbody").forEach((tbody) => { tbody.innerHTML = ""; });
+    const error = document.querySelector("#divError");
+    if (error) { error.textContent = ""; error.style.display = "none"; }
+    input.value = plate;
+    input.dispatchEvent(new Event("input", { bubbles: true }));
+    input.dispatchEvent(new Event("change", { bubbles: true }));
+    return true;
+}
+"""
+
+
+class PageStats:
+    """Navigation and network counters shared by all pages of a run."""
+
+    def __init__(self):
+        self.navigations = 0
+        self.saved_navigations = 0
+        self.blocked_requests = 0
+        self.received_bytes = 0
+
+    def as_dict(self):
+        return {
+            "navigations": self.navigations,
+            "saved_navigations": self.saved_navigations,
+            "blocked_requests": self.blocked_requests,
+            "received_bytes": self.received_bytes,
+        }
+
+
+class FormPage:
+    """Playwright page that stays on the lookup form between plates.
+
+    In warm mode the form is refilled and resubmitted in place; the page only
+    re-navigates when the form is missing or a previous plate left it in a bad
+    state. Attribute access falls through to the wrapped page.
+    """
+
+    def __init__(self, page, url, stats, warm=WARM_PAGES, blocked_types=BLOCKED_RESOURCE_TYPES, metrics=None,
+                 timeouts=None):
+        self.page = page
+        self.url = url
+        self.stats = stats
+        self.metrics = metrics  # Optional Metrics for goto/fill/click timings
+        self.timeouts = timeouts  # Optional AdaptiveTimeouts; replaces the fixed timeout per phase
+        self.warm = warm
+        self.blocked_types = set(blocked_types)
+        self.on_form = False
+        self._routed = False
+
+    def __getattr__(self, name):
+        return getattr(self.page, name)
+
+    @contextmanager
+    def _time(self, phase, timeout_phase=None):
+        """Times a phase for the metrics and, when it completes, for its adaptive timeout."""
+        started = time.monotonic()
+        with self.metrics.time(phase) if self.metrics else nullcontext():
+            yield
+        if self.timeouts and timeout_phase:
+            self.timeouts.record(timeout_phase, time.monotonic() - started)
+
+    def _timeout(self, phase, timeout, deadline):
+        """Milliseconds to allow a phase: adaptive if configured, else ``timeout``."""
+        if self.timeouts:
+            return self.timeouts.ms(phase, deadline)
+        if deadline:
+            return max(1, int(deadline.cap(timeout / 1000) * 1000))
+        return timeout
+
+    async def _route(self, route):
+        if route.request.resource_type in self.blocked_types:
+            self.stats.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _count_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.stats.received_bytes += int(length)
+
+    async def setup(self):
+        """Installs request blocking and byte accounting once per page."""
+        if self._routed:
+            return
+        if self.blocked_types:
+            await self.page.route("**/*", self._route)
+        self.page.on("response", self._count_response)
+        self._routed = True
+
+    async def navigate(self, timeout=5000, deadline=None):
+        await self.setup()
+        self.on_form = False
+        with self._time("goto", "goto"):
+            await self.page.goto(self.url, timeout=self._timeout("goto", timeout, deadline))
+        self.stats.navigations += 1
+        self.on_form = True
+
+    def invalidate(self):
+        """Forces a fresh navigation before the next plate (after a timeout or error)."""
+        self.on_form = False
+
+    async def submit(self, plate_number, timeout=5000, deadline=None):
+        """Puts the plate in the form and clicks "Yoxla", navigating only when needed.
+
+        ``timeout`` (ms) applies per step unless the page has adaptive timeouts;
+        either way no step runs past the plate's ``deadline``.
+        """
+        if self.warm and self.on_form and self.page.url.startswith(self.url):
+            with self._time("fill"):
+                refilled = await self.page.evaluate(REFILL_FORM_JS, plate_number)
+            if refilled:
+                self.stats.saved_navigations += 1
+                with self._time("click", "click"):
+                    await self.page.click(BUTTON_SELECTOR, timeout=self._timeout("click", timeout, deadline))
+                return
+        await self.navigate(timeout, deadline)
+        with self._time("fill", "fill"):
+            await self.page.fill(INPUT_SELECTOR, plate_number, timeout=self._timeout("fill", timeout, deadline))
+        with self._time("click", "click"):
+            await self.page.click(BUTTON_SELECTOR, timeout=self._timeout("click", timeout, deadline))
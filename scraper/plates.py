@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import string
+from itertools import product
+from config import PLATE_REGIONS
+
+LETTERS = [ch for ch in string.ascii_uppercase if ch not in ("I", "W")]
+LETTER_PAIRS = [ch1 + ch2 for ch1, ch2 in product(LETTERS, repeat=2)]  # 576 pairs
+NUMBERS_PER_BLOCK = 999  # 001 to 999
+PLATE_PATTERN = re.compile(r"\d{2}[" + "".join(LETTERS) + r"]{2}(?!000)\d{3}")  # Region, letter pair, 001-999
+
+
+def normalize_plate(text):
+    """Returns a plate such as "90AB123" from loose input ("90-ab 123"), or None if it isn't one."""
+    plate = re.sub(r"[\s\-]", "", text).upper()
+    return plate if PLATE_PATTERN.fullmatch(plate) else None
+
+
+class PlateSpace:
+    """Lazy view over the plate space, with each plate encoded as an integer.
+
+    A plate "90AB123" is the index ((region, pair), number) laid out as
+    ``block * 999 + (number - 1)``, where ``block`` walks regions then letter pairs
+    in the same order the old list-based generator used. Prefix filters and
+    sharding work on whole blocks, so nothing is materialized up front.
+    """
+
+    def __init__(self, regions=PLATE_REGIONS, prefixes=None, shard=0, shards=1):
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} out of range for {shards} shards")
+        self.regions = list(regions)
+        self.prefixes = list(prefixes) if prefixes else None
+        self.shard = shard
+        self.shards = shards
+        self._region_index = {region: i for i, region in enumerate(self.regions)}
+        self._pair_index = {pair: i for i, pair in enumerate(LETTER_PAIRS)}
+
+    def __len__(self):
+        return len(self.regions) * len(LETTER_PAIRS) * NUMBERS_PER_BLOCK
+
+    def __iter__(self):
+        return self.plates()
+
+    @property
+    def signature(self):
+        """Identifies the space so a persisted cursor is only reused for the same crawl."""
+        return {
+            "regions": self.regions,
+            "prefixes": self.prefixes,
+            "shard": self.shard,
+            "shards": self.shards,
+        }
+
+    def encode(self, plate_number):
+        """Returns the integer index of a plate such as '90AB123'."""
+        region, pair, number = plate_number[:-5], plate_number[-5:-3], int(plate_number[-3:])
+        try:
+            block = self._region_index[region] * len(LETTER_PAIRS) + self._pair_index[pair]
+        except KeyError:
+            raise ValueError(f"Plate {plate_number} is outside this plate space") from None
+        if not 1 <= number <= NUMBERS_PER_BLOCK:
+            raise ValueError(f"Plate {plate_number} is outside this plate space")
+        return block * NUMBERS_PER_BLOCK + number - 1
+
+    def decode(self, index):
+        """Returns the plate string for an integer index."""
+        block, number = divmod(index, NUMBERS_PER_BLOCK)
+        region, pair = divmod(block, len(LETTER_PAIRS))
+        return f"{self.regions[region]}{LETTER_PAIRS[pair]}{number + 1:03}"
+
+    def block_prefix(self, block):
+        region, pair = divmod(block, len(LETTER_PAIRS))
+        return self.regions[region] + LETTER_PAIRS[pair]
+
+    def blocks(self, start_block=0):
+        """Yields the block numbers selected by the prefix filters and this shard."""
+        for block in range(start_block, len(self.regions) * len(LETTER_PAIRS)):
+            if block % self.shards != self.shard:
+                continue
+            if self.prefixes is None:
+                yield block
+                continue
+            prefix = self.block_prefix(block)
+            if any(prefix.startswith(p) or p.startswith(prefix) for p in self.prefixes):
+                yield block
+
+    def _number_filter(self, block):
+        """Returns the number prefixes a block is limited to, or None for all of them."""
+        if self.prefixes is None:
+            return None
+        prefix = self.block_prefix(block)
+        if any(prefix.startswith(p) for p in self.prefixes):
+            return None
+        return [p[len(prefix):] for p in self.prefixes if p.startswith(prefix)]
+
+    def block_indices(self, block, first=0):
+        """Yields the selected plate indices of one block, from its ``first`` number on."""
+        number_prefixes = self._number_filter(block)
+        base = block * NUMBERS_PER_BLOCK
+        for number in range(first, NUMBERS_PER_BLOCK):
+            if number_prefixes is not None and not any(
+                f"{number + 1:03}".startswith(p) for p in number_prefixes
+            ):
+                continue
+            yield base + number
+
+    def block_size(self, block):
+        """Returns how many plates of a block the prefix filters select."""
+        if self._number_filter(block) is None:
+            return NUMBERS_PER_BLOCK
+        return sum(1 for _ in self.block_indices(block))
+
+    def indices(self, start=0):
+        """Yields plate indices in crawl order, starting at the given cursor."""
+        start_block, start_number = divmod(start, NUMBERS_PER_BLOCK)
+        for block in self.blocks(start_block):
+            yield from self.block_indices(block, start_number if block == start_block else 0)
+
+    def plates(self, start=0):
+        """Yields plate strings in crawl order, starting at the given cursor."""
+        for index in self.indices(start):
+            yield self.decode(index)
+
+
+class PlateCursor:
+    """Persists the position of a crawl within its plate space."""
+
+    def __init__(self, cursor_file, plate_space):
+        self.cursor_file = cursor_file
+        self.plate_space = plate_space
+
+    def load(self):
+        """Returns the saved index, or 0 if there is none for this plate space."""
+        try:
+            with open(self.cursor_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if data.get("space") != self.plate_space.signature:
+            return 0
+        return data.get("index", 0)
+
+    def save(self, index):
+        """Atomically records that every plate before ``index`` has been handled."""
+        os.makedirs(os.path.dirname(self.cursor_file) or ".", exist_ok=True)
+        tmp_file = self.cursor_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"space": self.plate_space.signature, "index": index}, f)
+        os.replace(tmp_file, self.cursor_file)
+
+
+def cursor_path(output_file):
+    """Returns the cursor file that belongs to a given snapshot file (data.json -> data.cursor)."""
+    return os.path.splitext(output_file)[0] + ".cursor"
@@ -0,0 +1,152 @@
+import asyncio
+import signal
+import time
+from logger.logger import logger
+
+_DONE = object()
+
+
+async def _iterate(items):
+    """Iterates sync and async iterables alike."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class WorkerPool:
+    """Runs one worker per resource (e.g. a browser page), all fed from a bounded queue.
+
+    Each worker pulls the next item as soon as it is free, so one slow plate only
+    holds up its own page. ``stop()`` (wired to SIGINT/SIGTERM) stops feeding new
+    items and lets queued and in-flight ones finish.
+    """
+
+    def __init__(self, handler, resources, queue_size=None, report_interval=10.0, on_report=None, limiter=None):
+        self.handler = handler  # async handler(item, resource)
+        self.limiter = limiter  # Optional AdaptiveConcurrency gating how many workers run at once
+        self.resources = list(resources)
+        self.queue_size = queue_size or 2 * len(self.resources)
+        self.report_interval = report_interval
+        self.on_report = on_report
+        self.unfinished = set()  # Items taken from the source that have not completed
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.idle_time = 0.0
+        self.started_at = None
+        self.stopping = False
+        self.queue = None
+        self._workers = []
+
+    def stop(self):
+        """Stops feeding new items; a second call cancels in-flight work."""
+        if self.stopping:
+            logger.warning("Forced shutdown, cancelling in-flight work.")
+            for task in self._workers:
+                task.cancel()
+            return
+        logger.info("Shutting down: draining queued and in-flight work.")
+        self.stopping = True
+
+    def stats(self):
+        """Returns throughput, in-flight count and the fraction of worker time spent idle."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9) if self.started_at else 0.0
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "workers": len(self.resources),
+            "elapsed": round(elapsed, 1),
+            "plates_per_sec": round(self.completed / elapsed, 2) if elapsed else 0.0,
+            "idle_fraction": round(self.idle_time / (elapsed * len(self.resources)), 3) if elapsed else 0.0,
+        }
+
+    async def _produce(self, items):
+        try:
+            async for item in _iterate(items):
+                if self.stopping:
+                    break
+                self.unfinished.add(item)
+                await self.queue.put(item)
+        finally:
+            # Even if the source failed, or the workers would wait for items forever
+            for _ in self.resources:
+                await self.queue.put(_DONE)
+
+    async def _work(self, resource):
+        while True:
+            if self.limiter:
+                await self.limiter.acquire()
+            try:
+                waited_from = time.monotonic()
+                item = await self.queue.get()
+                self.idle_time += time.monotonic() - waited_from
+                if item is _DONE:
+                    return
+                self.in_flight += 1
+                try:
+                    await self.handler(item, resource)
+                    self.unfinished.discard(item)
+                    self.completed += 1
+                except Exception as e:
+                    # Left in ``unfinished`` so a resumed run picks it up again
+                    logger.error(f"Worker failed on {item}: {e}")
+                    self.failed += 1
+                finally:
+                    self.in_flight -= 1
+            finally:
+                if self.limiter:
+                    await self.limiter.release()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            stats = self.stats()
+            if self.on_report:
+                try:
+                    self.on_report(stats)
+                except Exception:
+                    self.stop()  # E.g. the result store failed: stop taking plates it can't hold
+                    raise
+            else:
+                logger.info(f"Progress: {stats}")
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        installed = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+                installed.append(sig)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform / not the main thread
+        return installed
+
+    async def run(self, items):
+        """Processes every item from the (possibly lazy or async) iterable and returns the final stats."""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.started_at = time.monotonic()
+        installed = self._install_signal_handlers()
+        self._workers = [asyncio.create_task(self._work(resource)) for resource in self.resources]
+        producer = asyncio.create_task(self._produce(items))
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        finally:
+            producer.cancel()  # Only still running after a forced shutdown
+            reporter.cancel()
+            loop = asyncio.get_running_loop()
+            for sig in installed:
+                loop.remove_signal_handler(sig)
+            source_error, report_error = await asyncio.gather(producer, reporter, return_exceptions=True)
+        stats = self.stats()
+        logger.info(f"Finished: {stats}")
+        if isinstance(source_error, Exception):
+            raise source_error  # The item source failed: the run did not cover everything
+        if isinstance(report_error, Exception):
+            raise report_error
+        return stats
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import heapq
+import time
+from config import (
+    OUTPUT_FILE, PLATE_REGIONS, BACKEND, RECRAWL_BUDGET, RECRAWL_INSURED_MAX_AGE_DAYS, RECRAWL_FOUND_MAX_AGE_DAYS,
+    RECRAWL_FAILED_MAX_AGE_DAYS, RECRAWL_NOT_FOUND_MAX_AGE_DAYS, RECRAWL_NOT_FOUND_SHARE,
+)
+from logger.logger import logger, start_logging
+from main import InsuranceScraper
+
+DAY = 86400
+INSURED_STATUS = "Qüvvədədir"
+# Re-crawl tiers, in the order they are spent from the budget
+TIERS = ("insured", "found", "failed", "not_found")
+
+
+class RecrawlPlanner:
+    """Picks the plates most worth refreshing, within a request budget.
+
+    Policies with another status and "No Data" answers share the "found" tier;
+    "failed" holds only timed-out lookups.
+
+    A record is a candidate once it is older than its tier's maximum age; records
+    without ``scraped_at`` (crawled before it was recorded) count as infinitely
+    old. Tiers are filled in order, oldest first, and "Not Found" plates may take
+    at most ``not_found_share`` of the budget, so every run re-probes a thin,
+    rotating slice of them.
+    """
+
+    def __init__(self, budget=RECRAWL_BUDGET, insured_max_age=RECRAWL_INSURED_MAX_AGE_DAYS * DAY,
+                 found_max_age=RECRAWL_FOUND_MAX_AGE_DAYS * DAY, failed_max_age=RECRAWL_FAILED_MAX_AGE_DAYS * DAY,
+                 not_found_max_age=RECRAWL_NOT_FOUND_MAX_AGE_DAYS * DAY, not_found_share=RECRAWL_NOT_FOUND_SHARE):
+        self.budget = budget
+        self.max_ages = {
+            "insured": insured_max_age,
+            "found": found_max_age,
+            "failed": failed_max_age,
+            "not_found": not_found_max_age,
+        }
+        self.not_found_share = not_found_share
+        self.candidates = dict.fromkeys(TIERS, 0)
+        self.planned = dict.fromkeys(TIERS, 0)
+
+    def tier(self, result):
+        if isinstance(result, dict):
+            return "insured" if result.get("Status") == INSURED_STATUS else "found"
+        if result == "No Data":
+            return "found"  # The site knows the plate, it just shows no policy for it
+        if result == "Not Found":
+            return "not_found"
+        return "failed"  # "Timeout"
+
+    def plan(self, records, now=None):
+        """Returns the records to re-scrape, highest priority first.
+
+        ``records`` must hold each plate's latest record once (a store's
+        ``latest_records()``). They are streamed into one bounded heap per tier,
+        so memory stays at the budget however many records are stale.
+        """
+        now = time.time() if now is None else now
+        limits = {tier: self.budget for tier in TIERS}
+        limits["not_found"] = int(self.budget * self.not_found_share)
+        heaps = {tier: [] for tier in TIERS}
+        for record in records:
+            tier = self.tier(record["result"])
+            scraped_at = record.get("scraped_at", 0)
+            if now - scraped_at < self.max_ages[tier]:
+                continue
+            self.candidates[tier] += 1
+            if limits[tier] <= 0:
+                continue
+            entry = (-scraped_at, record["plate"], record)  # Max-heap on age: the root is the youngest kept plate
+            if len(heaps[tier]) < limits[tier]:
+                heapq.heappush(heaps[tier], entry)
+            elif entry[:2] > heaps[tier][0][:2]:
+                heapq.heapreplace(heaps[tier], entry)
+
+        planned = []
+        for tier in TIERS:
+            chosen = [record for *_, record in sorted(heaps[tier], reverse=True)][:self.budget - len(planned)]
+            self.planned[tier] = len(chosen)
+            planned.extend(chosen)
+        return planned
+
+    def stats(self):
+        return {"candidates": dict(self.candidates), "planned": dict(self.planned)}
+
+
+class RecrawlScraper(InsuranceScraper):
+    """InsuranceScraper that refreshes stale records chosen by a RecrawlPlanner instead of new plates."""
+
+    def __init__(self, output_file=OUTPUT_FILE, concurrency=5, regions=PLATE_REGIONS, planner=None, **kwargs):
+        super().__init__(output_file, concurrency, regions, **kwargs)
+        self.planner = planner or RecrawlPlanner()
+        in_space = set(self.plate_space.regions)
+        planned = self.planner.plan(
+            record for record in self.journal.latest_records() if record["plate"][:-5] in in_space
+        )
+        self.plan = [record["plate"] for record in planned]
+        # Keep the planned records, whose results the new ones replace in the aggregates
+        self.results = {record["plate"]: record["result"] for record in planned}
+        logger.info(f"Re-crawl plan: {self.planner.stats()}")
+
+    def pending_indices(self, start=0):
+        """Yields the planned plates; the crawl cursor plays no part in a re-crawl."""
+        for plate in self.plan:
+            if self.pool.stopping:
+                return
+            if plate not in self.attempts:  # Plates with retries pending are already scheduled
+                yield self.plate_space.encode(plate)
+
+    def checkpoint_cursor(self):
+        pass  # The cursor belongs to the full crawl and must not move
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the stalest records within a request budget.")
+    parser.add_argument("--budget", type=int, default=RECRAWL_BUDGET, help="plates to re-scrape this run")
+    parser.add_argument("--insured-max-age", type=float, default=RECRAWL_INSURED_MAX_AGE_DAYS, help="days")
+    parser.add_argument("--found-max-age", type=float, default=RECRAWL_FOUND_MAX_AGE_DAYS, help="days")
+    parser.add_argument("--failed-max-age", type=float, default=RECRAWL_FAILED_MAX_AGE_DAYS, help="days")
+    parser.add_argument("--not-found-max-age", type=float, default=RECRAWL_NOT_FOUND_MAX_AGE_DAYS, help="days")
+    parser.add_argument("--not-found-share", type=float, default=RECRAWL_NOT_FOUND_SHARE)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--regions", nargs="+", default=PLATE_REGIONS)
+    parser.add_argument("--backend", choices=["browser", "http"], default=BACKEND)
+    parser.add_argument("--dry-run", action="store_true", help="only print the plan")
+    args = parser.parse_args()
+    start_logging()
+
+    planner = RecrawlPlanner(
+        args.budget,
+        args.insured_max_age * DAY,
+        args.found_max_age * DAY,
+        args.failed_max_age * DAY,
+        args.not_found_max_age * DAY,
+        args.not_found_share,
+    )
+    scraper = RecrawlScraper(args.output, args.concurrency, args.regions, planner=planner, backend=args.backend)
+    if args.dry_run:
+        print(planner.stats())
+        print("\n".join(scraper.plan[:20]))
+    else:
+        asyncio.run(scraper.run())
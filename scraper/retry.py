@@ -0,0 +1,59 @@
+import heapq
+import itertools
+import random
+import time
+from config import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+
+class RetryScheduler:
+    """Delayed priority queue of items to try again, ordered by when they become due.
+
+    The delay doubles with every attempt (capped at ``max_delay``) and is jittered
+    so that a burst of timeouts doesn't come back as a burst of retries.
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.heap = []  # (due time, sequence, item)
+        self.scheduled = 0
+        self.gave_up = 0
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def backoff(self, attempts):
+        """Delay before the next try after ``attempts`` tries: half fixed, half random."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def schedule(self, item, attempts, delay=None):
+        """Queues another try unless ``attempts`` already reached the cap; returns whether it did."""
+        if attempts >= self.max_attempts:
+            self.gave_up += 1
+            return False
+        due = time.monotonic() + (self.backoff(attempts) if delay is None else delay)
+        heapq.heappush(self.heap, (due, next(self._sequence), item))
+        self.scheduled += 1
+        return True
+
+    def pop_due(self):
+        """Returns the next item whose delay has passed, or None."""
+        if self.heap and self.heap[0][0] <= time.monotonic():
+            return heapq.heappop(self.heap)[2]
+        return None
+
+    def items(self):
+        """Returns the queued items, in no particular order."""
+        return [item for _, _, item in self.heap]
+
+    def next_due_in(self):
+        """Seconds until the earliest queued retry is due (None if there is none)."""
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - time.monotonic())
+
+    def stats(self):
+        return {"retries_pending": len(self.heap), "retries_scheduled": self.scheduled, "retries_gave_up": self.gave_up}
@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+from collections import Counter, OrderedDict, deque
+from urllib.parse import unquote
+from playwright.async_api import async_playwright
+from config import (
+    OUTPUT_FILE, BACKEND, JOURNAL_FLUSH_INTERVAL, SERVICE_HOST, SERVICE_PORT, SERVICE_TTL_HOURS, SERVICE_CACHE_SIZE,
+    SERVICE_QUEUE_SIZE, SERVICE_MAX_BATCH,
+)
+from logger.logger import logger, start_logging
+from main import InsuranceScraper, is_retryable
+from scraper.concurrency import percentile
+from scraper.plates import normalize_plate
+from scraper.timeouts import CircuitBreaker
+from storage.journal import ResultJournal, JournalIndex
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class Unavailable(Exception):
+    """A live lookup can't be taken right now (queue full or site down); the client should retry."""
+
+
+class TTLCache:
+    """LRU of recent answers, each valid until its own expiry time."""
+
+    def __init__(self, maxsize=SERVICE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # key -> (value, expires at)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, expires):
+        self.entries[key] = (value, expires)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class LookupService:
+    """Answers single and batch plate lookups over HTTP, scraping live only when it has to.
+
+    A plate is answered from the LRU cache, else from the result store if its
+    record is younger than the TTL, else by a live scrape on one of the scraper's
+    warm pages. Concurrent requests for the same plate share one scrape, and live
+    lookups wait in a bounded queue: when it is full (or the circuit breaker is
+    open) requests fail fast with 503 instead of piling up behind the pages.
+    """
+
+    def __init__(self, scraper, ttl=SERVICE_TTL_HOURS * 3600, cache_size=SERVICE_CACHE_SIZE,
+                 queue_size=SERVICE_QUEUE_SIZE, max_batch=SERVICE_MAX_BATCH):
+        self.scraper = scraper
+        self.ttl = ttl
+        self.max_batch = max_batch
+        self.cache = TTLCache(cache_size)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.inflight = {}  # plate -> Future of its live scrape
+        # Reads single stored records on a miss; nothing of the store is held in memory
+        if isinstance(scraper.journal, ResultJournal):
+            self.store = JournalIndex(scraper.journal.journal_file)
+        else:
+            self.store = scraper.journal  # SQLite looks plates up by its index
+        self.sources = Counter()  # Answers by source (cache / store / live), plus coalesced and rejected lookups
+        self.latencies = deque(maxlen=1000)
+        self.server = None
+        self.tasks = []
+
+    def answer(self, plate, result, scraped_at, source):
+        self.sources[source] += 1
+        return {"plate": plate, "result": result, "source": source, "scraped_at": scraped_at}
+
+    def stored(self, plate):
+        """Returns (result, scraped_at) of a fresh stored record that isn't a failed lookup, caching it while fresh."""
+        record = self.store.record(plate)
+        if record is None or is_retryable(record["result"]):
+            return None
+        scraped_at = record.get("scraped_at", 0)
+        if scraped_at + self.ttl <= time.time():
+            return None
+        self.cache.put(plate, (record["result"], scraped_at), scraped_at + self.ttl)
+        return record["result"], scraped_at
+
+    async def lookup(self, plate):
+        """Returns the answer for one (normalized) plate; raises Unavailable when it can't scrape now."""
+        entry = self.cache.get(plate)
+        if entry is not None:
+            return self.answer(plate, *entry, "cache")
+        entry = self.stored(plate)
+        if entry is not None:
+            return self.answer(plate, *entry, "store")
+
+        future = self.inflight.get(plate)
+        if future is not None:
+            self.sources["coalesced"] += 1
+        else:
+            if self.scraper.breaker.state != CircuitBreaker.CLOSED:
+                self.sources["rejected"] += 1
+                raise Unavailable("The lookup site is not answering")
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self.queue.put_nowait((plate, future))
+            except asyncio.QueueFull:
+                self.sources["rejected"] += 1
+                raise Unavailable("Too many live lookups queued") from None
+            self.inflight[plate] = future
+        result, scraped_at = await asyncio.shield(future)  # A client hanging up doesn't cancel the shared scrape
+        return self.answer(plate, result, scraped_at, "live")
+
+    async def work(self, page):
+        """Runs queued live lookups on one worker page."""
+        while True:
+            plate, future = await self.queue.get()
+            try:
+                record = self.store.record(plate)
+                if record is not None:  # So the aggregates retract the stale result
+                    self.scraper.results.setdefault(plate, record["result"])
+                result = await self.scraper.scrape_plate(plate, page)
+                scraped_at = int(time.time())
+                if not is_retryable(result):
+                    self.cache.put(plate, (result, scraped_at), scraped_at + self.ttl)
+                future.set_result((result, scraped_at))
+            except Exception as e:
+                logger.error(f"Live lookup failed for {plate}: {e}")
+                future.set_exception(e)
+                future.exception()  # Marks it retrieved, in case every waiter hung up
+            finally:
+                self.scraper.attempts.pop(plate, None)  # The client decides whether to retry
+                del self.inflight[plate]
+
+    async def warm(self, pages):
+        """Opens every browser page on the form before the first request arrives."""
+        for page in pages:
+            if page is None:
+                continue  # HTTP workers need no warm-up
+            try:
+                form_page = await page.acquire()
+                await form_page.navigate()
+            except Exception as e:
+                logger.warning(f"Could not warm a page: {e}")
+
+    async def flush_periodically(self):
+        """Commits live results to the store and marks them in the bitmap, which evicts them from the scraper."""
+        while True:
+            await asyncio.sleep(JOURNAL_FLUSH_INTERVAL)
+            self.scraper.checkpoint_bitmap()
+
+    def stats(self):
+        latencies = list(self.latencies)
+        return {
+            "sources": dict(self.sources),
+            "cached": len(self.cache),
+            "queued": self.queue.qsize(),
+            "in_flight": len(self.inflight),
+            "p50_latency": round(percentile(latencies, 0.50), 4) if latencies else 0.0,
+            "p99_latency": round(percentile(latencies, 0.99), 4) if latencies else 0.0,
+            **self.scraper.collect_stats({}),
+        }
+
+    async def timed_lookup(self, plate):
+        started = time.monotonic()
+        try:
+            return await self.lookup(plate)
+        finally:
+            self.latencies.append(time.monotonic() - started)
+
+    async def route(self, method, path, body):
+        """Returns (status, JSON-able body) for one request."""
+        if method == "GET" and path.startswith("/plates/"):
+            plate = normalize_plate(unquote(path[len("/plates/"):]))
+            if plate is None:
+                return 400, {"error": "Not a plate number"}
+            try:
+                return 200, await self.timed_lookup(plate)
+            except Unavailable as e:
+                return 503, {"plate": plate, "error": str(e)}
+        if method == "POST" and path == "/plates":
+            try:
+                requested = json.loads(body or b"null")
+                requested = requested["plates"] if isinstance(requested, dict) else requested
+                if not isinstance(requested, list) or not all(isinstance(text, str) for text in requested):
+                    raise ValueError
+            except (ValueError, KeyError):
+                return 400, {"error": 'Expected {"plates": ["90AB123", ...]}'}
+            if len(requested) > self.max_batch:
+                return 413, {"error": f"At most {self.max_batch} plates per batch"}
+            return 200, {"results": await asyncio.gather(*(self.batch_item(text) for text in requested))}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        return 404, {"error": "Use GET /plates/<plate>, POST /plates or GET /stats"}
+
+    async def batch_item(self, text):
+        plate = normalize_plate(text)
+        if plate is None:
+            return {"plate": text, "error": "Not a plate number"}
+        try:
+            return await self.timed_lookup(plate)
+        except Unavailable as e:
+            return {"plate": plate, "error": str(e)}
+        except Exception as e:
+            return {"plate": plate, "error": f"Lookup failed: {e}"}
+
+    async def handle(self, reader, writer):
+        """Serves HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode("latin-1").split()
+                try:
+                    body = await reader.readexactly(int(headers.get("content-length") or 0))
+                    status, payload = await self.route(parts[0], parts[1].split("?", 1)[0], body)
+                except (IndexError, ValueError):
+                    status, payload = 400, {"error": "Malformed request"}
+                except Exception as e:
+                    logger.error(f"Lookup service error: {e}")
+                    status, payload = 503, {"error": "Lookup failed"}
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                close = headers.get("connection", "").lower() == "close"
+                head = [
+                    f"HTTP/1.1 {status} {REASONS[status]}",
+                    "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(data)}",
+                    f"Connection: {'close' if close else 'keep-alive'}",
+                ]
+                if status == 503:
+                    head.append("Retry-After: 1")  # Back-pressure: come back shortly
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def start(self, playwright, host=SERVICE_HOST, port=SERVICE_PORT):
+        """Opens and warms the pages, starts the workers and listens; returns the bound port."""
+        pages = self.scraper.open_pages(playwright)
+        await self.warm(pages)
+        self.tasks = [asyncio.create_task(self.work(page)) for page in pages]
+        self.tasks.append(asyncio.create_task(self.flush_periodically()))
+        self.server = await asyncio.start_server(self.handle, host, port)
+        port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Lookup service on http://{host}:{port}/plates/<plate>")
+        return port
+
+    async def stop(self):
+        """Stops listening and the workers, then persists what the live lookups found."""
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.tasks:
+            task.cancel()
+        await self.scraper.close_pages()
+        self.scraper.close_bitmap()  # Also saves the aggregates
+        self.scraper.journal.close()
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        """Runs the service until SIGINT/SIGTERM."""
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform / not the main thread
+        async with async_playwright() as p:
+            await self.start(p, host, port)
+            try:
+                await stopping.wait()
+            finally:
+                await self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve on-demand plate lookups over HTTP.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--pages", type=int, default=5, help="warm pages (or HTTP connections) for live lookups")
+    parser.add_argument("--ttl-hours", type=float, default=SERVICE_TTL_HOURS, help="how long a result stays fresh")
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--backend", choices=["browser", "http"], default=BACKEND)
+    args = parser.parse_args()
+    start_logging()
+
+    scraper = InsuranceScraper(args.output, args.pages, backend=args.backend, adaptive=False, metrics_port=None,
+                               parquet=False)
+    service = LookupService(scraper, ttl=args.ttl_hours * 3600, queue_size=args.queue_size)
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+from config import (
+    OUTCOME_TIMEOUT, HTTP_TIMEOUT, TIMEOUT_QUANTILE, TIMEOUT_HEADROOM, TIMEOUT_MIN, TIMEOUT_MAX, TIMEOUT_WINDOW,
+    TIMEOUT_MIN_SAMPLES, BREAKER_FAILURES, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN,
+)
+from logger.logger import logger
+from scraper.concurrency import percentile
+
+# Fixed timeouts (seconds) each phase starts from, before it has enough samples of its own
+DEFAULT_TIMEOUTS = {"goto": 5.0, "fill": 5.0, "click": 5.0, "outcome": OUTCOME_TIMEOUT / 1000, "http": HTTP_TIMEOUT}
+
+
+class AdaptiveTimeouts:
+    """Per-phase timeouts that follow the site's recent latency.
+
+    Each phase keeps a rolling window of successful durations; its timeout is
+    ``headroom`` times their ``quantile``, clamped to [minimum, maximum]. A fast
+    site gets failures detected quickly, a slow one stops turning valid plates
+    into "Timeout" records.
+    """
+
+    def __init__(self, defaults=DEFAULT_TIMEOUTS, quantile=TIMEOUT_QUANTILE, headroom=TIMEOUT_HEADROOM,
+                 minimum=TIMEOUT_MIN, maximum=TIMEOUT_MAX, window=TIMEOUT_WINDOW, min_samples=TIMEOUT_MIN_SAMPLES,
+                 refresh_every=20):
+        self.defaults = dict(defaults)
+        self.quantile = quantile
+        self.headroom = headroom
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self.samples = {phase: deque(maxlen=window) for phase in self.defaults}
+        self.current = dict(self.defaults)
+        self._since_refresh = dict.fromkeys(self.defaults, 0)
+
+    def record(self, phase, seconds):
+        """Adds the duration of a phase that completed; the timeout is recomputed every few samples."""
+        if phase not in self.samples:
+            return
+        self.samples[phase].append(seconds)
+        self._since_refresh[phase] += 1
+        if self._since_refresh[phase] >= self.refresh_every and len(self.samples[phase]) >= self.min_samples:
+            self._since_refresh[phase] = 0
+            observed = percentile(self.samples[phase], self.quantile) * self.headroom
+            self.current[phase] = max(self.minimum, min(self.maximum, observed))
+
+    def get(self, phase, deadline=None):
+        """Timeout for a phase in seconds, cut short by the plate's remaining deadline."""
+        seconds = self.current[phase]
+        return deadline.cap(seconds) if deadline else seconds
+
+    def ms(self, phase, deadline=None):
+        """Same as ``get`` in milliseconds, as Playwright wants them (never 0, which means no timeout)."""
+        return max(1, int(self.get(phase, deadline) * 1000))
+
+    def stats(self):
+        return {f"timeout_{phase}": round(seconds, 2) for phase, seconds in self.current.items()}
+
+
+class Deadline:
+    """Overall time budget of one plate, shared by all its phases."""
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def cap(self, seconds):
+        return min(seconds, self.remaining())
+
+
+class CircuitBreaker:
+    """Stops plates from being sent while the site looks down, then probes until it is back.
+
+    ``failures`` consecutive failed plates (timeouts, errors) open the breaker:
+    workers wait in ``admit()`` instead of turning the crawl into "Timeout"
+    records. After the cooldown one probe plate goes through; a success closes
+    the breaker, a failure reopens it with the cooldown doubled (up to
+    ``max_cooldown``).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN,
+                 poll_interval=0.5):
+        self.failures = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.poll_interval = poll_interval
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.paused_seconds = 0.0  # Summed over the waiting workers
+
+    async def admit(self):
+        """Waits while the breaker is open; returns whether the plate now let through is the probe."""
+        probe = False
+        waited_from = None
+        while self.state != self.CLOSED:
+            if waited_from is None:
+                waited_from = time.monotonic()
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                logger.info("Circuit breaker half-open: probing the site.")
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = probe = True
+                break
+            await asyncio.sleep(self.poll_interval)
+        if waited_from is not None:
+            self.paused_seconds += time.monotonic() - waited_from
+        return probe
+
+    def record(self, failed, probe=False):
+        """Feeds back the outcome of an admitted plate; only the probe's failure reopens a half-open breaker."""
+        if probe:
+            self.probing = False
+        if not failed:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed: the site is answering again.")
+            self.state = self.CLOSED
+            self.consecutive = 0
+            self.cooldown = self.base_cooldown
+            return
+        self.consecutive += 1
+        if probe:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == self.CLOSED and self.consecutive >= self.failures:
+            self._open()
+
+    def release_probe(self, probe):
+        """Lets another plate probe after the probe was abandoned (e.g. cancelled) without an outcome."""
+        if probe:
+            self.probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(
+            f"Circuit breaker open after {self.consecutive} consecutive failures; pausing for {self.cooldown:.0f}s."
+        )
+
+    def stats(self):
+        return {
+            "breaker_state": self.state,
+            "breaker_trips": self.trips,
+            "breaker_wait_seconds": round(self.paused_seconds, 1),
+        }
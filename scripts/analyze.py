@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import matplotlib
+matplotlib.use("Agg")  # Render straight to files, no display needed
+import matplotlib.pyplot as plt
+import polars as pl
+import seaborn as sns
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import OUTPUT_FILE
+from storage.aggregates import AggregateStore, aggregates_path
+from storage.parquet import dataset_path, scan_dataset
+
+IMAGES_DIR = "images"
+HASHES_FILE = ".chart_hashes.json"  # Input hash per rendered figure, kept in the images folder
+COLUMNS = ["Error", "Marka", "Model", "Status", "Organization"]
+PAIRS = [("Marka", "Status"), ("Marka", "Organization"), ("Model", "Organization")]
+
+
+def aggregate(lazy_frame):
+    """Computes every table the charts need in one pass over the dataset.
+
+    The per-column and per-pair counts are collected together, so Polars plans a
+    single scan of the Parquet files and shares it between all the group-bys.
+    """
+    base = lazy_frame.select(
+        pl.col("Error").cast(pl.String).fill_null("Success"),
+        *(pl.col(column).cast(pl.String) for column in COLUMNS[1:]),
+    )
+    queries = [
+        base.drop_nulls(column).group_by(column).agg(pl.len().alias("count")).sort(["count", column], descending=[True, False])
+        for column in COLUMNS
+    ] + [
+        base.drop_nulls([rows, columns]).group_by(rows, columns).agg(pl.len().alias("count"))
+        for rows, columns in PAIRS
+    ]
+    frames = pl.collect_all(queries)
+    tables = dict(zip(COLUMNS, frames))
+    tables.update(zip(PAIRS, frames[len(COLUMNS):]))
+    return tables
+
+
+def tables_from_aggregates(store):
+    """The same tables as ``aggregate``, taken from the counts the scraper keeps instead of a scan."""
+    tables = {}
+    for column in COLUMNS:
+        counts = sorted(store.counts[column].items(), key=lambda item: (-item[1], item[0]))
+        tables[column] = pl.DataFrame(counts, schema={column: pl.String, "count": pl.UInt32}, orient="row")
+    for rows, columns in PAIRS:
+        cells = [
+            (row_value, column_value, count)
+            for row_value, row in store.crosstabs[(rows, columns)].items()
+            for column_value, count in row.items()
+        ]
+        tables[(rows, columns)] = pl.DataFrame(
+            cells, schema={rows: pl.String, columns: pl.String, "count": pl.UInt32}, orient="row"
+        )
+    return tables
+
+
+def top_values(counts, column, n):
+    return counts[column].head(n).to_list()
+
+
+def crosstab(tables, rows, columns, n):
+    """Long-format counts for the ``n`` most frequent ``rows`` values, largest first."""
+    order = top_values(tables[rows], rows, n)
+    frame = tables[(rows, columns)].filter(pl.col(rows).is_in(order))
+    return frame.sort(
+        pl.col(rows).replace_strict(order, list(range(len(order)))), pl.col("count"), pl.col(columns),
+        descending=[False, True, False],
+    )
+
+
+def chart_inputs(tables):
+    """The exact data behind each figure, keyed by its file name."""
+    return {
+        "error_distribution.png": tables["Error"],
+        "top_car_brands.png": tables["Marka"].filter(pl.col("count") >= 20),
+        "insurance_status_distribution.png": tables["Status"],
+        "top_10_car_models.png": tables["Model"].head(10),
+        "brand_status_correlation.png": crosstab(tables, "Marka", "Status", 20),
+        "insurance_company_distribution.png": tables["Organization"],
+        "brand_company_correlation.png": crosstab(tables, "Marka", "Organization", 10),
+        "model_company_correlation.png": crosstab(tables, "Model", "Organization", 10),
+        "market_share_of_insurance_companies.png": tables["Organization"],
+    }
+
+
+def bar_chart(data, column, title, ylabel, palette, figsize):
+    plt.figure(figsize=figsize)
+    sns.barplot(data=data, x="count", y=column, hue=column, palette=palette, legend=False)
+    plt.title(title)
+    plt.xlabel("Count")
+    plt.ylabel(ylabel)
+
+
+def grouped_chart(data, rows, columns, title, xlabel, legend, palette):
+    plt.figure(figsize=(12, 8))
+    sns.barplot(data=data, x=rows, y="count", hue=columns, palette=palette)
+    plt.title(title, fontsize=16)
+    plt.xlabel(xlabel, fontsize=12)
+    plt.ylabel("Count", fontsize=12)
+    plt.xticks(rotation=90)
+    plt.legend(title=legend, title_fontsize=12, fontsize=10)
+
+
+def draw(name, data):
+    """Draws one figure in the notebook's style from its precomputed counts."""
+    data = data.to_pandas()
+    if name == "error_distribution.png":
+        plt.figure()
+        sns.barplot(data=data, x="Error", y="count", hue="Error", palette="viridis", legend=False)
+        plt.title("Distribution of Errors")
+        plt.xlabel("Error Type")
+        plt.ylabel("Count")
+        plt.xticks(rotation=45)
+    elif name == "top_car_brands.png":
+        bar_chart(data, "Marka", "Top Car Brands (Marka) with at Least 20 Occurrences", "Car Brand", "magma", (10, 6))
+    elif name == "insurance_status_distribution.png":
+        bar_chart(data, "Status", "Distribution of Insurance Status", "Status", "plasma", (8, 6))
+    elif name == "top_10_car_models.png":
+        bar_chart(data, "Model", "Top 10 Car Models", "Car Model", "rocket", (10, 6))
+    elif name == "brand_status_correlation.png":
+        grouped_chart(data, "Marka", "Status", "Correlation Between Car Brand and Insurance Status", "Car Brand",
+                      "Status", "coolwarm")
+    elif name == "insurance_company_distribution.png":
+        bar_chart(data, "Organization", "Distribution of Records by Insurance Company", "Insurance Company",
+                  "viridis", (10, 6))
+    elif name == "brand_company_correlation.png":
+        grouped_chart(data, "Marka", "Organization", "Correlation Between Car Brands and Insurance Companies",
+                      "Car Brand", "Insurance Company", "coolwarm")
+    elif name == "model_company_correlation.png":
+        grouped_chart(data, "Model", "Organization", "Car Models Insured by Insurance Companies", "Car Model",
+                      "Insurance Company", "Set1")
+    elif name == "market_share_of_insurance_companies.png":
+        plt.figure(figsize=(8, 8))
+        plt.pie(data["count"], labels=data["Organization"], autopct="%1.1f%%", startangle=90,
+                colors=sns.color_palette("pastel"))
+        plt.title("Market Share of Insurance Companies", fontsize=16)
+    plt.tight_layout()
+
+
+def data_hash(data):
+    return hashlib.sha256(json.dumps(data.rows(), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def render(inputs, images_dir=IMAGES_DIR, dpi=300, force=False):
+    """Renders the figures whose input counts changed since they were last drawn; returns their names."""
+    os.makedirs(images_dir, exist_ok=True)
+    hashes_file = os.path.join(images_dir, HASHES_FILE)
+    try:
+        with open(hashes_file, "r", encoding="utf-8") as f:
+            hashes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        hashes = {}
+
+    rendered = []
+    for name, data in inputs.items():
+        path = os.path.join(images_dir, name)
+        digest = data_hash(data)
+        if not force and hashes.get(name) == digest and os.path.exists(path):
+            continue  # Same numbers as the image on disk
+        draw(name, data)
+        plt.savefig(path, dpi=dpi)
+        plt.close("all")
+        hashes[name] = digest
+        rendered.append(name)
+
+    with open(hashes_file, "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=4, sort_keys=True)
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the analysis charts from the result aggregates.")
+    parser.add_argument("--aggregates", default=aggregates_path(OUTPUT_FILE),
+                        help="aggregates the scraper keeps current (data.aggregates.json)")
+    parser.add_argument("--dataset", default=dataset_path(OUTPUT_FILE), help="Parquet dataset directory")
+    parser.add_argument("--scan", action="store_true",
+                        help="count from one scan of the Parquet dataset (also used without an aggregates file)")
+    parser.add_argument("--images", default=IMAGES_DIR, help="where the PNGs go")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--force", action="store_true", help="re-render even unchanged figures")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    if args.scan or not os.path.exists(args.aggregates):
+        source = args.dataset
+        tables = aggregate(scan_dataset(args.dataset))
+    else:
+        source = args.aggregates
+        tables = tables_from_aggregates(AggregateStore.load(args.aggregates))
+    loaded = time.monotonic()
+    rendered = render(chart_inputs(tables), args.images, args.dpi, args.force)
+    print(f"Read {source} in {loaded - started:.2f}s, rendered {len(rendered)} charts in "
+          f"{time.monotonic() - loaded:.2f}s: {', '.join(rendered) or 'all up to date'}")
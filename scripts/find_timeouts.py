@@ -1,6 +1,11 @@
 import json
+import os
 import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from config import OUTPUT_FILE
+from storage.sqlite_store import SqliteStore, store_path
 
 def find_timeouts(json_file):
     try:
@@ -15,7 +20,15 @@ def find_timeouts(json_file):
 
     return [key for key, value in data.items() if value == "Timeout"]
 
+def find_timeouts_in_store(db_file):
+    """Reads only the Timeout plates, through the outcome index."""
+    return list(SqliteStore(db_file).plates(outcome="Timeout"))
+
 if __name__ == "__main__":
 
-    timeouts = find_timeouts(OUTPUT_FILE)
-    print("Timeout entries:", timeouts)
\ No newline at end of file
+    db_file = store_path(OUTPUT_FILE)
+    if os.path.exists(db_file):
+        timeouts = find_timeouts_in_store(db_file)
+    else:
+        timeouts = find_timeouts(OUTPUT_FILE)
+    print("Timeout entries:", timeouts)
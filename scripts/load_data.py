@@ -1,67 +1,24 @@
-import json
+import os
+import sys
 import polars as pl
-# Load JSON data
-with open('output/data.json', 'r', encoding='utf-8') as file:
-    data = json.load(file)
 
-# # Sample JSON data (replace this with loading from a file)
-# json_data = '''
-# {
-#     "77BM238": {
-#         "Təşkilat": "\\"QALA SIĞORTA\\" AÇIQ SƏHMDAR CƏMİYYƏTİ",
-#         "Dövlət qeydiyyat nömrəsi": "77BM238",
-#         "Marka": "TOYOTA",
-#         "Model": "PRİUS",
-#         "Status": "Qüvvədədir"
-#     },
-#     "77BM244": "Timeout",
-#     "77BM253": "Not Found"
-# }
-# '''
-# 
-# # Load JSON data
-# data = json.loads(json_data)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Initialize lists to store data
-plates = []
-organizations = []
-registration_numbers = []
-markas = []
-models = []
-statuses = []
-errors = []
+from config import OUTPUT_FILE
+from storage.journal import ResultJournal, journal_path
+from storage.parquet import ParquetExporter, dataset_path, scan_dataset
 
-# Parse JSON and populate lists
-for plate, details in data.items():
-    plates.append(plate)
-    if isinstance(details, dict):  # Successfully retrieved data
-        organizations.append(details["Təşkilat"])
-        registration_numbers.append(details["Dövlət qeydiyyat nömrəsi"])
-        markas.append(details["Marka"])
-        models.append(details["Model"])
-        statuses.append(details["Status"])
-        errors.append(None)  # No error
-    else:  # Timeout or Not Found
-        organizations.append(None)
-        registration_numbers.append(None)
-        markas.append(None)
-        models.append(None)
-        statuses.append(None)
-        errors.append(details)  # Store "Timeout" or "Not Found"
+# Bring output/data.parquet up to date with the scraped results. Only journal records
+# written since the last export are read; a legacy data.json without a journal is
+# imported into one first.
+journal = ResultJournal(journal_path(OUTPUT_FILE))
+if not os.path.exists(journal.journal_file):
+    journal.import_snapshot(OUTPUT_FILE)
+exporter = ParquetExporter(dataset_path(OUTPUT_FILE), journal.journal_file)
+written = exporter.export()
+print(f"Exported {written} plates into {exporter.dataset_dir}")
 
-# Create Polars DataFrame
-df = pl.DataFrame({
-    "Plate": plates,
-    "Organization": organizations,
-    "Registration Number": registration_numbers,
-    "Marka": markas,
-    "Model": models,
-    "Status": statuses,
-    "Error": errors
-})
-
-# Save DataFrame to CSV
-df.write_csv("output/car_plate_data.csv")
-
-print("CSV file created successfully!")
-print(df)
\ No newline at end of file
+# Downstream loads are a columnar scan; Region and Letter partitions prune on filters
+df = scan_dataset(exporter.dataset_dir)
+print(df.group_by("Error").agg(pl.len()).collect())
+print(df.head(10).collect())
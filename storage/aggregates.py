@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+from collections import Counter, defaultdict
+from config import OUTPUT_FILE
+from storage.journal import ResultJournal, journal_path
+
+# Chart columns (as in the notebook) and the result fields they come from; found plates
+# count under their first policy, like one row of the Parquet dataset
+COLUMN_FIELDS = {"Organization": "Təşkilat", "Marka": "Marka", "Model": "Model", "Status": "Status"}
+COUNT_COLUMNS = ["Error", *COLUMN_FIELDS]
+# (row, column) pairs of the cross-tab charts: brand x status, brand x company, model x company
+CROSSTABS = [("Marka", "Status"), ("Marka", "Organization"), ("Model", "Organization")]
+SUCCESS = "Success"  # "Error" value of plates with a policy
+
+
+def aggregates_path(output_file):
+    """Returns the aggregate file that sits next to a snapshot file (data.json -> data.aggregates.json)."""
+    return os.path.splitext(output_file)[0] + ".aggregates.json"
+
+
+def crosstab_key(rows, columns):
+    return f"{rows}/{columns}"
+
+
+class AggregateStore:
+    """Running value counts and cross-tab count matrices over the latest result of every plate.
+
+    The scraper applies each new result (and retracts the one it replaces), so the
+    tables stay exact without rescanning the data; charts and the summary command
+    read the persisted file.
+    """
+
+    def __init__(self):
+        self.position = None  # Store position the tables are consistent with, when the scraper saved them
+        self.plates = 0
+        self.counts = {column: Counter() for column in COUNT_COLUMNS}
+        self.crosstabs = {(rows, columns): defaultdict(Counter) for rows, columns in CROSSTABS}
+
+    @classmethod
+    def from_results(cls, results):
+        store = cls()
+        for result in results.values():
+            store.add(result)
+        return store
+
+    def _row(self, result):
+        if isinstance(result, dict):
+            row = {column: result.get(field) for column, field in COLUMN_FIELDS.items()}
+            row["Error"] = SUCCESS
+            return row
+        return {"Error": result}
+
+    def _apply(self, result, delta):
+        row = self._row(result)
+        self.plates += delta
+        for column, value in row.items():
+            if value is None:
+                continue
+            counts = self.counts[column]
+            counts[value] += delta
+            if counts[value] <= 0:
+                del counts[value]
+        for (rows, columns), matrix in self.crosstabs.items():
+            row_value, column_value = row.get(rows), row.get(columns)
+            if row_value is None or column_value is None:
+                continue
+            cells = matrix[row_value]
+            cells[column_value] += delta
+            if cells[column_value] <= 0:
+                del cells[column_value]
+                if not cells:
+                    del matrix[row_value]
+
+    def add(self, result):
+        self._apply(result, 1)
+
+    def remove(self, result):
+        self._apply(result, -1)
+
+    def replace(self, previous, result):
+        """Swaps a plate's previous result (None if it had none) for its new one."""
+        if previous is not None:
+            self.remove(previous)
+        self.add(result)
+
+    def value_counts(self, column, top=None, minimum=1):
+        """Returns [(value, count), ...] for a column, largest first."""
+        return [(value, count) for value, count in self.counts[column].most_common(top) if count >= minimum]
+
+    def crosstab(self, rows, columns, top=None):
+        """Returns {row value: {column value: count}} for the ``top`` most frequent row values."""
+        matrix = self.crosstabs[(rows, columns)]
+        return {value: dict(matrix[value]) for value, _ in self.counts[rows].most_common(top) if value in matrix}
+
+    def to_dict(self):
+        return {
+            "plates": self.plates,
+            "counts": {column: dict(counts.most_common()) for column, counts in self.counts.items()},
+            "crosstabs": {
+                crosstab_key(rows, columns): {value: dict(cells) for value, cells in matrix.items()}
+                for (rows, columns), matrix in self.crosstabs.items()
+            },
+        }
+
+    def save(self, aggregates_file, position=None):
+        save_tables(self.to_dict(), aggregates_file, position)
+
+    @classmethod
+    def load(cls, aggregates_file):
+        store = cls()
+        with open(aggregates_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        store.position = data.get("position")
+        store.plates = data["plates"]
+        for column, counts in data["counts"].items():
+            store.counts[column] = Counter(counts)
+        for rows, columns in CROSSTABS:
+            for value, cells in data["crosstabs"].get(crosstab_key(rows, columns), {}).items():
+                store.crosstabs[(rows, columns)][value] = Counter(cells)
+        return store
+
+
+def save_tables(tables, aggregates_file, position=None):
+    """Writes ``to_dict()`` tables atomically so readers never see a partial file."""
+    os.makedirs(os.path.dirname(aggregates_file) or ".", exist_ok=True)
+    tmp_file = aggregates_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({**tables, "position": position}, f, ensure_ascii=False)
+    os.replace(tmp_file, aggregates_file)
+
+
+def print_summary(store, top=10):
+    print(f"Plates: {store.plates}")
+    for column in COUNT_COLUMNS:
+        print(f"\n{column}:")
+        for value, count in store.value_counts(column, top):
+            print(f"  {count:>8}  {value}")
+    for rows, columns in CROSSTABS:
+        print(f"\n{rows} x {columns} (top {top} {rows}):")
+        for value, cells in store.crosstab(rows, columns, top).items():
+            cells = ", ".join(f"{name}: {count}" for name, count in Counter(cells).most_common(3))
+            print(f"  {value}: {cells}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the precomputed result aggregates.")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="snapshot file the aggregates belong to")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the aggregates from the journal first")
+    args = parser.parse_args()
+
+    aggregates_file = aggregates_path(args.output)
+    if args.rebuild or not os.path.exists(aggregates_file):
+        AggregateStore.from_results(ResultJournal(journal_path(args.output)).replay()).save(aggregates_file)
+    print_summary(AggregateStore.load(aggregates_file), args.top)
@@ -0,0 +1,170 @@
+import json
+import mmap
+import os
+from collections import Counter
+from scraper.plates import LETTER_PAIRS, NUMBERS_PER_BLOCK, PlateSpace
+
+# Two bits per plate: no result yet, "Not Found" / "No Data", a policy, a failed lookup ("Timeout")
+STATE_EMPTY, STATE_DONE, STATE_FOUND, STATE_FAILED = range(4)
+STATE_NAMES = ("empty", "done", "found", "failed")
+PLATES_PER_REGION = len(LETTER_PAIRS) * NUMBERS_PER_BLOCK
+REGION_BYTES = PLATES_PER_REGION // 4  # 143,856 bytes per region
+# The four plate states packed in each byte value, for counting and unpacking whole ranges
+BYTE_STATES = [[(byte >> shift) & 3 for shift in (0, 2, 4, 6)] for byte in range(256)]
+LOW_BITS = int.from_bytes(b"\x55" * REGION_BYTES, "little")  # The low bit of every plate in a region
+
+
+def bitmap_path(output_file):
+    """Returns the bitmap that belongs to a given snapshot file (data.json -> data.bitmap)."""
+    return os.path.splitext(output_file)[0] + ".bitmap"
+
+
+class CompletionBitmap:
+    """Memory-mapped state of every plate, two bits each, keyed by the plate's integer encoding.
+
+    Regions are laid out in the order they were first seen, so crawls, batches and
+    lookups over different region sets share one file. A JSON sidecar records the
+    regions and whatever the caller saves with them (e.g. the store position the
+    bits are consistent with).
+    """
+
+    def __init__(self, bitmap_file):
+        self.bitmap_file = bitmap_file
+        self.meta_file = bitmap_file + ".json"
+        self.space = PlateSpace([])
+        self.counts = [0] * len(STATE_NAMES)
+        self._file = None
+        self._map = None
+
+    def open(self, regions=()):
+        """Maps the file, adding any missing ``regions``; returns the saved sidecar, or None if there is none.
+
+        A bitmap without a (matching) sidecar is discarded and starts empty.
+        """
+        meta = self._read_meta()
+        if meta is None and os.path.exists(self.meta_file):
+            os.remove(self.meta_file)  # Must not vouch for the fresh bits
+        os.makedirs(os.path.dirname(self.bitmap_file) or ".", exist_ok=True)
+        self._file = open(self.bitmap_file, "r+b" if meta else "w+b")
+        self.space = PlateSpace(meta["regions"] if meta else [])
+        self._remap()
+        for region in regions:
+            self.add_region(region)
+        return meta
+
+    def load(self):
+        """Maps an existing bitmap read-only, e.g. another process's; returns its sidecar, or None if it has none.
+
+        Nothing is mapped without a matching sidecar, and ``counts`` are not kept.
+        """
+        meta = self._read_meta()
+        if meta is not None:
+            self._file = open(self.bitmap_file, "rb")
+            self.space = PlateSpace(meta["regions"])
+            size = len(self.space.regions) * REGION_BYTES
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+        return meta
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if os.path.getsize(self.bitmap_file) != len(meta["regions"]) * REGION_BYTES:
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return meta
+
+    def _remap(self):
+        size = len(self.space.regions) * REGION_BYTES
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size) if size else None
+        self._count()
+
+    def _count(self):
+        byte_counts = Counter(self._map[:]) if self._map is not None else {}
+        self.counts = [0] * len(STATE_NAMES)
+        for byte, count in byte_counts.items():
+            for state in BYTE_STATES[byte]:
+                self.counts[state] += count
+
+    def add_region(self, region):
+        if region not in self.space.regions:
+            self.flush()
+            self.space = PlateSpace([*self.space.regions, region])
+            self._remap()
+
+    def clear(self):
+        """Resets every plate to STATE_EMPTY, keeping the regions."""
+        if self._map is not None:
+            self._map[:] = bytes(len(self._map))
+        self.counts = [0] * len(STATE_NAMES)
+        self.counts[STATE_EMPTY] = len(self.space)
+
+    def get(self, plate_number):
+        try:
+            index = self.space.encode(plate_number)
+        except ValueError:
+            return STATE_EMPTY  # A region this bitmap has never seen
+        return (self._map[index >> 2] >> ((index & 3) * 2)) & 3
+
+    def set(self, plate_number, state):
+        try:
+            index = self.space.encode(plate_number)
+        except ValueError:
+            self.add_region(plate_number[:-5])
+            index = self.space.encode(plate_number)
+        shift = (index & 3) * 2
+        byte = self._map[index >> 2]
+        self.counts[(byte >> shift) & 3] -= 1
+        self.counts[state] += 1
+        self._map[index >> 2] = byte & ~(3 << shift) | state << shift
+
+    def block_counts(self, prefix):
+        """Returns {state: plates} over the 999 plates of a region/letter-pair block such as '90AB'."""
+        try:
+            start = self.space.encode(prefix + "001")
+        except ValueError:
+            return Counter({STATE_EMPTY: NUMBERS_PER_BLOCK})
+        first, offset = divmod(start, 4)
+        data = self._map[first:(start + NUMBERS_PER_BLOCK + 3) // 4]
+        states = [state for byte in data for state in BYTE_STATES[byte]]
+        return Counter(states[offset:offset + NUMBERS_PER_BLOCK])
+
+    def update(self, other):
+        """Copies another bitmap's state of every plate that has none here, region by region."""
+        for source, region in enumerate(other.space.regions):
+            self.add_region(region)
+            target = self.space.regions.index(region) * REGION_BYTES
+            theirs = int.from_bytes(other._map[source * REGION_BYTES:(source + 1) * REGION_BYTES], "little")
+            if not theirs:
+                continue
+            ours = int.from_bytes(self._map[target:target + REGION_BYTES], "little")
+            has_result = (ours | ours >> 1) & LOW_BITS
+            merged = ours | theirs & ~(has_result * 3)
+            self._map[target:target + REGION_BYTES] = merged.to_bytes(REGION_BYTES, "little")
+        self._count()
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    def save(self, **meta):
+        """Flushes the bits, then atomically writes the sidecar saying what they are consistent with."""
+        self.flush()
+        tmp_file = self.meta_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"regions": self.space.regions, **meta}, f)
+        os.replace(tmp_file, self.meta_file)
+
+    def close(self):
+        self.flush()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {f"bitmap_{STATE_NAMES[state]}": self.counts[state] for state in (STATE_DONE, STATE_FOUND, STATE_FAILED)}
@@ -0,0 +1,316 @@
+import json
+import os
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    OUTPUT_FILE,
+    JOURNAL_FSYNC_POLICY,
+    JOURNAL_FSYNC_INTERVAL,
+    JOURNAL_BATCH_SIZE,
+    JOURNAL_FLUSH_INTERVAL,
+)
+from scraper.plates import LETTER_PAIRS, NUMBERS_PER_BLOCK, PlateSpace
+
+
+def journal_path(output_file):
+    """Returns the journal file that backs a given snapshot file (data.json -> data.jsonl)."""
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+class JournalIndex:
+    """Byte offset of every plate's latest record in a journal, so single records can be read without a replay.
+
+    Offsets live in one flat array keyed by the plate's integer encoding (8 bytes
+    per possible plate of the regions seen), not in a dict per record. The index
+    catches up with records appended since the last read, and starts over if the
+    journal was replaced (e.g. compacted).
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.space = PlateSpace([])
+        self.offsets = array("q")  # Offset + 1 of each plate's latest record; 0 = no record
+        self.inode = None
+        self.size = 0  # Bytes indexed so far, always at a line boundary
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self.inode or stat.st_size < self.size:
+            self.space, self.offsets, self.inode, self.size = PlateSpace([]), array("q"), stat.st_ino, 0
+        if stat.st_size == self.size:
+            return
+        with open(self.journal_file, "rb") as f:
+            f.seek(self.size)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written; read again next time
+                try:
+                    plate_number = json.loads(line)["plate"]
+                    index = self._encode(plate_number)
+                except (ValueError, KeyError, TypeError, IndexError):
+                    index = None  # Torn write from an interrupted run
+                if index is not None:
+                    self.offsets[index] = self.size + 1
+                self.size += len(line)
+
+    def _encode(self, plate_number):
+        try:
+            return self.space.encode(plate_number)
+        except ValueError:
+            region = plate_number[:-5]
+            if region in self.space.regions:
+                return None  # Not a valid plate number
+            self.space = PlateSpace([*self.space.regions, region])
+            self.offsets.frombytes(bytes(len(LETTER_PAIRS) * NUMBERS_PER_BLOCK * self.offsets.itemsize))
+            return self.space.encode(plate_number)
+
+    def record(self, plate_number):
+        """Returns the latest record of a plate, or None if it has none."""
+        self.refresh()
+        try:
+            offset = self.offsets[self.space.encode(plate_number)]
+        except ValueError:
+            return None
+        if not offset:
+            return None
+        with open(self.journal_file, "rb") as f:
+            f.seek(offset - 1)
+            return json.loads(f.readline())
+
+
+class ResultJournal:
+    """Append-only JSONL journal holding one compact record per scraped plate.
+
+    Records are buffered and group-committed on a single background thread, so
+    appending never blocks the event loop and commits stay in order.
+    """
+
+    def __init__(
+        self,
+        journal_file=journal_path(OUTPUT_FILE),
+        fsync_policy=JOURNAL_FSYNC_POLICY,
+        batch_size=JOURNAL_BATCH_SIZE,
+        flush_interval=JOURNAL_FLUSH_INTERVAL,
+        fsync_interval=JOURNAL_FSYNC_INTERVAL,
+    ):
+        if fsync_policy not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.journal_file = journal_file
+        self.fsync_policy = fsync_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.last_fsync = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._file = None
+        self._writes = []  # Group commits no checkpoint has waited for yet
+
+    def replay_records(self, offset=0):
+        """Yields every record in the journal (from a byte offset on) in write order."""
+        try:
+            with open(self.journal_file, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Torn tail write from an interrupted run, possibly cut inside a character
+        except FileNotFoundError:
+            return
+
+    def latest_records(self, chunk_size=1 << 20):
+        """Yields each plate's latest record once, newest first, reading the journal backwards.
+
+        Plates already yielded are tracked in a bitset keyed by the plate's
+        integer encoding, so memory stays flat however many records there are.
+        """
+        try:
+            f = open(self.journal_file, "rb")
+        except FileNotFoundError:
+            return
+        space, seen = PlateSpace([]), bytearray()
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            carry = b""  # Start of the line cut by the previous chunk
+            while end > 0:
+                start = max(0, end - chunk_size)
+                f.seek(start)
+                lines = (f.read(end - start) + carry).split(b"\n")
+                carry = lines.pop(0) if start else b""
+                end = start
+                for line in reversed(lines):
+                    try:
+                        record = json.loads(line)
+                        plate_number = record["plate"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Blank line, or a torn tail write from an interrupted run
+                    try:
+                        index = space.encode(plate_number)
+                    except ValueError:
+                        region = plate_number[:-5]
+                        if region in space.regions:
+                            continue  # Not a valid plate number
+                        space = PlateSpace([*space.regions, region])
+                        seen.extend(bytes(len(LETTER_PAIRS) * NUMBERS_PER_BLOCK // 8))
+                        index = space.encode(plate_number)
+                    if not seen[index >> 3] & 1 << (index & 7):
+                        seen[index >> 3] |= 1 << (index & 7)
+                        yield record
+
+    def position(self):
+        """Where the journal ends; with ``records_since`` it lets derived state resume from there."""
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return {"file": self.journal_file, "inode": None, "size": 0}
+        return {"file": self.journal_file, "inode": stat.st_ino, "size": stat.st_size}
+
+    def records_since(self, position):
+        """Iterates over the records written after ``position``; None if the journal was replaced since."""
+        current = self.position()
+        if position.get("file") != current["file"] or position.get("size", 0) > current["size"] or (
+            position.get("inode") not in (None, current["inode"])
+        ):
+            return None
+        return self.replay_records(position.get("size", 0))
+
+    def replay(self):
+        """Rebuilds the plate -> result dict from the journal (later records win)."""
+        return {record["plate"]: record["result"] for record in self.replay_records()}
+
+    def append(self, plate_number, result, **meta):
+        """Queues one record; commits the group once it is full or old enough.
+
+        Extra keyword arguments (e.g. ``attempts``) are stored on the record but
+        not in the data.json snapshot.
+        """
+        self.pending.append(self.encode(plate_number, result, **meta))
+        if (
+            len(self.pending) >= self.batch_size
+            or time.monotonic() - self.last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def encode(self, plate_number, result, **meta):
+        return json.dumps(
+            {"plate": plate_number, "result": result, **meta},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def flush(self):
+        """Hands the pending group to the writer thread and returns immediately."""
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return None
+        lines, self.pending = self.pending, []
+        # Keep the commits that failed, or may still fail, for the next checkpoint to report
+        self._writes = [write for write in self._writes if not write.done() or write.exception()]
+        write = self._executor.submit(self._write, lines)
+        self._writes.append(write)
+        return write
+
+    def _write(self, lines):
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.journal_file) or ".", exist_ok=True)
+                self._file = open(self.journal_file, "a+b")
+                if self._file.seek(0, os.SEEK_END) > 0:
+                    self._file.seek(-1, os.SEEK_END)
+                    if self._file.read(1) != b"\n":
+                        self._file.write(b"\n")  # Terminate a torn tail so it can't swallow new records
+            self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+            self._file.flush()
+            now = time.monotonic()
+            if self.fsync_policy == "always" or (
+                self.fsync_policy == "interval" and now - self.last_fsync >= self.fsync_interval
+            ):
+                os.fsync(self._file.fileno())
+                self.last_fsync = now
+        except BaseException:
+            self._discard_file()  # The next group reopens the journal and terminates whatever got written
+            raise
+
+    def _discard_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _after_writes(self, writes, callback, *args):
+        for write in writes:
+            write.result()  # Re-raises a failed group commit: nothing may build on its records
+        return callback(*args)
+
+    def checkpoint(self, callback, *args):
+        """Runs ``callback`` on the writer thread once everything appended so far is written.
+
+        If a group commit since the last checkpoint failed, the returned future
+        raises its error instead and ``callback`` is not run.
+        """
+        self.flush()
+        writes, self._writes = self._writes, []
+        return self._executor.submit(self._after_writes, writes, callback, *args)
+
+    def _sync_and_close(self):
+        if self._file is not None:
+            if self.fsync_policy != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Commits everything still pending and waits for the writer thread; raises if a commit failed."""
+        self.flush()
+        writes, self._writes = self._writes, []
+        self._executor.submit(self._sync_and_close).result()
+        for write in writes:
+            write.result()
+
+    def compact(self, snapshot_file=OUTPUT_FILE):
+        """Drops superseded records and writes a data.json-compatible snapshot."""
+        self.close()
+        records = {record["plate"]: record for record in self.replay_records()}
+
+        tmp_journal = self.journal_file + ".tmp"
+        with open(tmp_journal, "w", encoding="utf-8") as f:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_journal, self.journal_file)
+
+        results = {plate_number: record["result"] for plate_number, record in records.items()}
+        os.makedirs(os.path.dirname(snapshot_file) or ".", exist_ok=True)
+        tmp_snapshot = snapshot_file + ".tmp"
+        with open(tmp_snapshot, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_snapshot, snapshot_file)
+        return results
+
+    def import_snapshot(self, snapshot_file=OUTPUT_FILE):
+        """Seeds an empty journal from a legacy data.json so old crawls can resume."""
+        try:
+            with open(snapshot_file, "r", encoding="utf-8") as f:
+                results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        for plate_number, result in results.items():
+            self.pending.append(self.encode(plate_number, result))
+        self.close()
+        return results
+
+
+if __name__ == "__main__":
+    # Compact the journal and refresh output/data.json
+    journal = ResultJournal()
+    results = journal.compact()
+    print(f"Compacted {len(results)} records into {OUTPUT_FILE}")
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+from collections import defaultdict
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from config import OUTPUT_FILE
+from models.models import RESULT_FIELDS
+from storage.journal import journal_path
+
+# One row per plate; the first policy's fields, like the old car_plate_data.csv, plus the policy count
+FIELD_COLUMNS = dict(zip(["Organization", "Registration Number", "Marka", "Model", "Status"], RESULT_FIELDS))
+# Low-cardinality columns stored as Parquet dictionaries (Categorical in Polars/pandas)
+DICTIONARY_COLUMNS = ["Organization", "Marka", "Model", "Status", "Error"]
+SCHEMA = pa.schema(
+    [(name, pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS else pa.string())
+     for name in ["Plate", *FIELD_COLUMNS, "Error"]]
+    + [("Policies", pa.int16())]
+)
+PARTITION_SCHEMA = pa.schema([("Region", pa.string()), ("Letter", pa.string())])
+STATE_FILE = "_export_state.json"
+
+
+def dataset_path(output_file):
+    """Returns the Parquet dataset directory next to a snapshot file (data.json -> data.parquet/)."""
+    return os.path.splitext(output_file)[0] + ".parquet"
+
+
+def partition_of(plate_number):
+    """Hive partition of a plate: its region and the first letter of its letter pair."""
+    return plate_number[:-5], plate_number[-5]
+
+
+def to_row(plate_number, result):
+    if isinstance(result, dict):
+        row = {name: result.get(field) for name, field in FIELD_COLUMNS.items()}
+        row.update(Plate=plate_number, Error=None, Policies=len(result.get("Policies") or [result]))
+    else:
+        row = dict.fromkeys(FIELD_COLUMNS, None)
+        row.update(Plate=plate_number, Error=result, Policies=0)  # "Not Found", "No Data" or "Timeout"
+    return row
+
+
+def to_table(rows):
+    columns = {name: [row[name] for row in rows] for name in SCHEMA.names}
+    return pa.table(
+        {name: pa.array(values, pa.string()).dictionary_encode() if name in DICTIONARY_COLUMNS
+         else pa.array(values, SCHEMA.field(name).type) for name, values in columns.items()},
+        schema=SCHEMA,
+    )
+
+
+class ParquetExporter:
+    """Keeps a Region/Letter-partitioned Parquet copy of the result journal up to date.
+
+    Each export reads only the journal bytes written since the previous one and
+    rewrites just the partitions those records fall into (later records replace
+    earlier ones for the same plate). When the journal has been replaced, e.g.
+    by compaction, the whole dataset is rebuilt from it.
+    """
+
+    def __init__(self, dataset_dir=dataset_path(OUTPUT_FILE), journal_file=journal_path(OUTPUT_FILE)):
+        self.dataset_dir = dataset_dir
+        self.journal_file = journal_file
+        self.state_file = os.path.join(dataset_dir, STATE_FILE)
+
+    def partition_file(self, region, letter):
+        return os.path.join(self.dataset_dir, f"Region={region}", f"Letter={letter}", "data.parquet")
+
+    def load_state(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self, offset, inode):
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "inode": inode}, f)
+        os.replace(tmp_file, self.state_file)
+
+    def read_new_records(self, offset):
+        """Returns the latest result per plate written after ``offset`` and the new offset."""
+        latest = {}
+        with open(self.journal_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written; picked up by the next export
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn line from an interrupted run
+                latest[record["plate"]] = record["result"]
+        return latest, offset
+
+    def write_partition(self, path, table):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = os.path.join(os.path.dirname(path), ".data.parquet.tmp")  # Hidden from dataset scans
+        pq.write_table(table.sort_by("Plate"), tmp_file, compression="zstd", use_dictionary=DICTIONARY_COLUMNS)
+        os.replace(tmp_file, path)
+
+    def export(self):
+        """Folds new journal records into the dataset; returns the number of plates written."""
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return 0
+        state = self.load_state()
+        rebuild = state.get("inode") != stat.st_ino or state.get("offset", 0) > stat.st_size
+        latest, offset = self.read_new_records(0 if rebuild else state["offset"])
+        if rebuild and os.path.isdir(self.dataset_dir):
+            shutil.rmtree(self.dataset_dir)
+        os.makedirs(self.dataset_dir, exist_ok=True)
+
+        partitions = defaultdict(list)
+        for plate_number, result in latest.items():
+            partitions[partition_of(plate_number)].append(to_row(plate_number, result))
+        for (region, letter), rows in partitions.items():
+            path = self.partition_file(region, letter)
+            table = to_table(rows)
+            if os.path.exists(path):
+                existing = pq.read_table(path, schema=SCHEMA)
+                kept = existing.filter(pc.invert(pc.is_in(existing["Plate"], table["Plate"])))
+                table = pa.concat_tables([kept, table]).unify_dictionaries()
+            self.write_partition(path, table)
+        self.save_state(offset, stat.st_ino)
+        return len(latest)
+
+    def mark_exported(self):
+        """Records the current journal as fully exported (call right after compacting an exported journal)."""
+        stat = os.stat(self.journal_file)
+        self.save_state(stat.st_size, stat.st_ino)
+
+
+def read_dataset(dataset_dir=dataset_path(OUTPUT_FILE), columns=None, filters=None):
+    """Reads the dataset (or a column/partition subset of it) as an Arrow table."""
+    return pq.read_table(
+        dataset_dir,
+        columns=columns,
+        filters=filters,
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        ignore_prefixes=[".", "_"],
+    )
+
+
+def scan_dataset(dataset_dir=dataset_path(OUTPUT_FILE)):
+    """Lazily scans the dataset with Polars; Region and Letter come from the partition directories."""
+    return pl.scan_parquet(
+        os.path.join(dataset_dir, "**", "data.parquet"),
+        hive_partitioning=True,
+        hive_schema={"Region": pl.String, "Letter": pl.String},
+    )
+
+
+if __name__ == "__main__":
+    # Bring output/data.parquet up to date with the journal
+    exporter = ParquetExporter()
+    written = exporter.export()
+    print(f"Exported {written} plates into {exporter.dataset_dir}")
@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from config import OUTPUT_FILE, JOURNAL_BATCH_SIZE, JOURNAL_FLUSH_INTERVAL
+from storage.journal import ResultJournal
+
+FOUND = "Found"  # outcome of plates with a policy; the other outcomes are the stored strings
+# Query filters and the columns (all indexed) they match
+FILTER_COLUMNS = {
+    "region": "region",
+    "outcome": "outcome",
+    "organization": "organization",
+    "brand": "brand",
+    "model": "model",
+    "status": "status",
+}
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS results ("
+    " plate TEXT PRIMARY KEY,"
+    " region TEXT NOT NULL,"
+    " outcome TEXT NOT NULL,"  # Found / Not Found / No Data / Timeout
+    " organization TEXT,"
+    " registration_number TEXT,"
+    " brand TEXT,"
+    " model TEXT,"
+    " status TEXT,"
+    " result TEXT NOT NULL,"  # The stored result value as JSON, every policy included
+    " meta TEXT,"  # Extra record fields (attempts, ...) as JSON
+    " seq INTEGER)",  # Write order: every upsert moves the plate past all others
+]
+INDEXES = [
+    *(f"CREATE INDEX IF NOT EXISTS results_{column} ON results ({column})" for column in FILTER_COLUMNS.values()),
+    "CREATE INDEX IF NOT EXISTS results_seq ON results (seq)",
+]
+UPSERT = (
+    "INSERT INTO results (plate, region, outcome, organization, registration_number, brand, model, status,"
+    " result, meta, seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT IFNULL(MAX(seq), 0) + 1 FROM results))"
+    " ON CONFLICT (plate) DO UPDATE SET region = excluded.region, outcome = excluded.outcome,"
+    " organization = excluded.organization, registration_number = excluded.registration_number,"
+    " brand = excluded.brand, model = excluded.model, status = excluded.status,"
+    " result = excluded.result, meta = excluded.meta, seq = excluded.seq"
+)
+
+
+def store_path(output_file):
+    """Returns the SQLite store that backs a given snapshot file (data.json -> data.sqlite)."""
+    return os.path.splitext(output_file)[0] + ".sqlite"
+
+
+def to_row(plate_number, result, meta):
+    row = [plate_number, plate_number[:-5]]
+    if isinstance(result, dict):
+        row += [FOUND, result.get("Təşkilat"), result.get("Dövlət qeydiyyat nömrəsi"), result.get("Marka"),
+                result.get("Model"), result.get("Status")]
+    else:
+        row += [result, None, None, None, None, None]
+    row += [
+        json.dumps(result, ensure_ascii=False, separators=(",", ":")),
+        json.dumps(meta, separators=(",", ":")) if meta else None,
+    ]
+    return row
+
+
+class SqliteStore:
+    """Result store in an indexed SQLite table, usable in place of the ResultJournal.
+
+    Upserts are grouped into one transaction per batch and written on a single
+    background thread, like the journal's group commits. The database runs in
+    WAL mode, so queries from other processes (the CLI, models.models, scripts)
+    read a consistent snapshot while a crawl is writing.
+    """
+
+    def __init__(self, db_file=store_path(OUTPUT_FILE), batch_size=JOURNAL_BATCH_SIZE,
+                 flush_interval=JOURNAL_FLUSH_INTERVAL):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._db = None  # Writer connection, only touched on the writer thread
+        self._writes = []  # Batches no checkpoint has waited for yet
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+            if "seq" not in {column[1] for column in db.execute("PRAGMA table_info(results)")}:
+                # Stores written before the seq column: their rows keep insertion order
+                db.execute("ALTER TABLE results ADD COLUMN seq INTEGER")
+                db.execute("UPDATE results SET seq = rowid")
+                db.commit()
+            for statement in INDEXES:
+                db.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # Writing (ResultJournal interface)
+
+    def append(self, plate_number, result, **meta):
+        """Queues one upsert; commits the batch once it is full or old enough."""
+        self.pending.append(to_row(plate_number, result, meta))
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Hands the pending batch to the writer thread and returns immediately."""
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return None
+        rows, self.pending = self.pending, []
+        # Keep the batches that failed, or may still fail, for the next checkpoint to report
+        self._writes = [write for write in self._writes if not write.done() or write.exception()]
+        write = self._executor.submit(self._write, rows)
+        self._writes.append(write)
+        return write
+
+    def _write(self, rows):
+        try:
+            if self._db is None:
+                self._db = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+                self._db.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; WAL keeps it consistent
+            with self._db:
+                self._db.executemany(UPSERT, rows)
+        except BaseException:
+            self._close_db()  # The transaction was rolled back; the next batch reconnects
+            raise
+
+    def _after_writes(self, writes, callback, *args):
+        for write in writes:
+            write.result()  # Re-raises a failed batch: nothing may build on its rows
+        return callback(*args)
+
+    def checkpoint(self, callback, *args):
+        """Runs ``callback`` on the writer thread once everything appended so far is committed.
+
+        If a batch since the last checkpoint failed, the returned future raises
+        its error instead and ``callback`` is not run.
+        """
+        self.flush()
+        writes, self._writes = self._writes, []
+        return self._executor.submit(self._after_writes, writes, callback, *args)
+
+    def _close_db(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def close(self):
+        """Commits everything still pending and waits for the writer thread; raises if a batch failed."""
+        self.flush()
+        writes, self._writes = self._writes, []
+        self._executor.submit(self._close_db).result()
+        for write in writes:
+            write.result()
+
+    def replay_records(self):
+        """Yields every record as the journal would: {"plate", "result", **meta}, in write order."""
+        return self._records_after(0)
+
+    def latest_records(self):
+        """Yields each plate's record; the store only keeps the latest one."""
+        return self.replay_records()
+
+    def position(self):
+        """Where the store's write order ends; with ``records_since`` it lets derived state resume from there."""
+        with self._connect() as db:
+            (seq,) = db.execute("SELECT IFNULL(MAX(seq), 0) FROM results").fetchone()
+        return {"file": self.db_file, "inode": os.stat(self.db_file).st_ino, "seq": seq}
+
+    def records_since(self, position):
+        """Iterates over the plates upserted after ``position``; None if the store was replaced since.
+
+        Only each plate's latest record is kept, so a plate written both before
+        and after ``position`` comes back once, with its latest result.
+        """
+        current = self.position()
+        if position.get("file") != current["file"] or position.get("inode") != current["inode"] or (
+            position.get("seq", current["seq"] + 1) > current["seq"]
+        ):
+            return None
+        return self._records_after(position["seq"])
+
+    def _records_after(self, seq):
+        with self._connect() as db:
+            rows = db.execute("SELECT plate, result, meta FROM results WHERE seq > ? ORDER BY seq", (seq,))
+            for plate_number, result, meta in rows:
+                yield {"plate": plate_number, "result": json.loads(result), **(json.loads(meta) if meta else {})}
+
+    def replay(self):
+        return {record["plate"]: record["result"] for record in self.replay_records()}
+
+    def compact(self, snapshot_file=OUTPUT_FILE):
+        """Folds the WAL into the database and writes a data.json-compatible snapshot."""
+        self.close()
+        with self._connect() as db:
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        results = self.replay()
+        os.makedirs(os.path.dirname(snapshot_file) or ".", exist_ok=True)
+        tmp_snapshot = snapshot_file + ".tmp"
+        with open(tmp_snapshot, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_snapshot, snapshot_file)
+        return results
+
+    def import_snapshot(self, snapshot_file=OUTPUT_FILE):
+        """Seeds an empty store from a legacy data.json so old crawls can resume."""
+        try:
+            with open(snapshot_file, "r", encoding="utf-8") as f:
+                results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        self.import_records({"plate": plate, "result": result} for plate, result in results.items())
+        return results
+
+    def import_records(self, records):
+        """Upserts journal-style records in batches (later records win)."""
+        for record in records:
+            self.append(record.pop("plate"), record.pop("result"), **record)
+        self.close()
+
+    # Querying
+
+    def _where(self, filters):
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        clauses = [f"{FILTER_COLUMNS[name]} = ?" for name, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def record(self, plate_number):
+        """Returns the stored record of one plate as the journal would hold it, or None."""
+        with self._connect() as db:
+            row = db.execute("SELECT result, meta FROM results WHERE plate = ?", (plate_number,)).fetchone()
+        if row is None:
+            return None
+        return {"plate": plate_number, "result": json.loads(row[0]), **(json.loads(row[1]) if row[1] else {})}
+
+    def get(self, plate_number):
+        """Returns the stored result for one plate, or None."""
+        with self._connect() as db:
+            row = db.execute("SELECT result FROM results WHERE plate = ?", (plate_number,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, limit=None, **filters):
+        """Yields (plate, result) for plates matching every given filter, e.g. brand="TOYOTA", region="90"."""
+        where, params = self._where(filters)
+        sql = "SELECT plate, result FROM results" + where + " ORDER BY plate"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as db:
+            for plate_number, result in db.execute(sql, params):
+                yield plate_number, json.loads(result)
+
+    def plates(self, **filters):
+        """Yields just the plate numbers matching the filters (served from the indexes)."""
+        where, params = self._where(filters)
+        with self._connect() as db:
+            for (plate_number,) in db.execute("SELECT plate FROM results" + where + " ORDER BY plate", params):
+                yield plate_number
+
+    def count(self, by=None, **filters):
+        """Counts matching plates, or returns {value: count} when grouped ``by`` a filter column."""
+        where, params = self._where(filters)
+        with self._connect() as db:
+            if by is None:
+                return db.execute("SELECT COUNT(*) FROM results" + where, params).fetchone()[0]
+            column = FILTER_COLUMNS[by]
+            sql = f"SELECT {column}, COUNT(*) FROM results{where} GROUP BY {column} ORDER BY COUNT(*) DESC"
+            return dict(db.execute(sql, params).fetchall())
+
+    def distinct(self, column, **filters):
+        """Returns the distinct non-null values of a filter column."""
+        column = FILTER_COLUMNS[column]
+        where, params = self._where(filters)
+        where = (where + " AND " if where else " WHERE ") + f"{column} IS NOT NULL"
+        with self._connect() as db:
+            return {value for (value,) in db.execute(f"SELECT DISTINCT {column} FROM results{where}", params)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the SQLite result store.")
+    parser.add_argument("--db", default=store_path(OUTPUT_FILE))
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [("query", "print matching records"), ("plates", "print matching plate numbers"),
+                            ("count", "count matching plates")]:
+        command = commands.add_parser(name, help=help_text)
+        for option in FILTER_COLUMNS:
+            command.add_argument(f"--{option}")
+        if name == "query":
+            command.add_argument("--limit", type=int)
+        if name == "count":
+            command.add_argument("--by", choices=list(FILTER_COLUMNS), help="count per value of this column")
+    command = commands.add_parser("import", help="load a result journal (.jsonl) or data.json into the store")
+    command.add_argument("source")
+    args = parser.parse_args()
+
+    store = SqliteStore(args.db)
+    filters = {option: getattr(args, option, None) for option in FILTER_COLUMNS}
+    if args.command == "query":
+        for plate_number, result in store.query(limit=args.limit, **filters):
+            print(json.dumps({"plate": plate_number, "result": result}, ensure_ascii=False))
+    elif args.command == "plates":
+        for plate_number in store.plates(**filters):
+            print(plate_number)
+    elif args.command == "count":
+        counts = store.count(by=args.by, **filters)
+        if isinstance(counts, dict):
+            for value, count in counts.items():
+                print(f"{count:>8}  {value}")
+        else:
+            print(counts)
+    elif args.source.endswith(".jsonl"):
+        store.import_records(ResultJournal(args.source).replay_records())
+        print(f"Imported {args.source} into {args.db} ({store.count()} plates)")
+    else:
+        store.import_snapshot(args.source)
+        print(f"Imported {args.source} into {args.db} ({store.count()} plates)")
@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+from main import InsuranceScraper
+from storage.bitmap import STATE_EMPTY, STATE_DONE, STATE_FOUND, STATE_FAILED
+from storage.journal import ResultJournal
+from storage.sqlite_store import SqliteStore, store_path
+from test_journal import POLICY, JournalTestCase, journal_lines, tear_last_record
+
+
+def forbid_full_replay():
+    """Fails a test that reads the journal from the start; reading a tail is fine."""
+    replay_records = ResultJournal.replay_records
+
+    def tail_only(journal, offset=0):
+        if offset == 0:
+            raise AssertionError("journal replayed from the start")
+        return replay_records(journal, offset)
+
+    return mock.patch.object(ResultJournal, "replay_records", tail_only)
+
+
+def forbid_store_replay():
+    """Fails a test that reads the whole SQLite store; reading the rows after a position is fine."""
+    return mock.patch.object(SqliteStore, "replay_records", side_effect=AssertionError("store replayed"))
+
+
+class ResumeTestCase(JournalTestCase):
+    """Two runs over the same output, with a crash or a compaction between them."""
+
+    store = "journal"
+
+    def scraper(self):
+        scraper = InsuranceScraper(
+            self.output_file, regions=["90"], prefixes=["90AA"], metrics_port=None, parquet=False, store=self.store
+        )
+        scraper.journal.fsync_policy = "never"
+        self.addCleanup(scraper.bitmap.close)
+        self.addCleanup(scraper.journal.close)
+        return scraper
+
+    def save(self, scraper, plate, result, attempts=1):
+        """Records a result the way scrape_plate does."""
+        previous = scraper.previous_result(plate)
+        scraper.results[plate] = result
+        scraper.attempts[plate] = attempts
+        scraper.save_data(plate)
+        scraper.update_aggregates(plate, previous)
+        scraper.attempts.pop(plate)
+
+    def finish(self, scraper):
+        scraper.pool = SimpleNamespace(unfinished=set())  # finish() only asks the pool for the watermark
+        scraper.finish()
+
+    def first_run(self):
+        scraper = self.scraper()
+        self.save(scraper, "90AA001", "Timeout")
+        self.save(scraper, "90AA001", POLICY, attempts=2)  # Supersedes the timeout
+        self.save(scraper, "90AA002", "Not Found")
+        self.save(scraper, "90AA003", "Timeout", attempts=2)
+        return scraper
+
+    def assert_states(self, scraper):
+        self.assertEqual(scraper.bitmap.get("90AA001"), STATE_FOUND)
+        self.assertEqual(scraper.bitmap.get("90AA002"), STATE_DONE)
+        self.assertEqual(scraper.bitmap.get("90AA003"), STATE_FAILED)
+        self.assertEqual(scraper.bitmap.get("90AA004"), STATE_EMPTY)
+        self.assertEqual(scraper.failed, {"90AA003": 2})
+        self.assertEqual(scraper.aggregates.plates, 3)
+        self.assertEqual(dict(scraper.aggregates.counts["Error"]), {"Success": 1, "Not Found": 1, "Timeout": 1})
+
+
+class BitmapResumeTest(ResumeTestCase):
+    def test_clean_stop_resumes_without_reading_the_journal(self):
+        self.finish(self.first_run())
+        with forbid_full_replay():
+            scraper = self.scraper()
+        self.assert_states(scraper)
+        self.assertEqual(scraper.record_count, 4)
+
+    def test_crash_replays_the_tail_and_skips_a_torn_record(self):
+        scraper = self.first_run()
+        scraper.mark_all()  # Last checkpoint before the crash
+        self.save(scraper, "90AA004", "Not Found")
+        self.save(scraper, "90AA005", POLICY)
+        scraper.journal.close()
+        tear_last_record(self.journal_file)
+
+        scraper = self.scraper()
+        self.assertEqual(scraper.bitmap.get("90AA004"), STATE_DONE)
+        self.assertEqual(scraper.bitmap.get("90AA005"), STATE_EMPTY)  # Torn, so it is scraped again
+        self.assertEqual(scraper.aggregates.plates, 4)
+        self.save(scraper, "90AA005", POLICY)
+        scraper.close_bitmap()
+        scraper.journal.close()
+        self.assertEqual(ResultJournal(self.journal_file).replay()["90AA005"], POLICY)
+
+    def test_crash_tail_rescraping_an_earlier_plate_recounts_the_aggregates(self):
+        scraper = self.first_run()
+        scraper.mark_all()
+        self.save(scraper, "90AA002", POLICY)  # Not Found before the checkpoint
+        self.save(scraper, "90AA004", "Not Found")
+        scraper.journal.close()
+
+        scraper = self.scraper()
+        self.assertEqual(scraper.aggregates.plates, 4)
+        self.assertEqual(dict(scraper.aggregates.counts["Error"]), {"Success": 2, "Not Found": 1, "Timeout": 1})
+
+    def test_failed_write_is_not_marked_done(self):
+        scraper = self.first_run()
+        with mock.patch.object(scraper.journal, "_write", side_effect=OSError(28, "No space left on device")):
+            self.save(scraper, "90AA004", "Not Found")
+            self.assertRaises(OSError, scraper.mark_all)
+        self.assertEqual(scraper.bitmap.get("90AA004"), STATE_EMPTY)
+        self.assertIn("90AA004", scraper.results)  # Still in memory, so this run does not scrape it again
+
+    def test_compaction_at_finish_keeps_the_bitmap(self):
+        with mock.patch.object(main, "JOURNAL_COMPACT_RATIO", 1.0):
+            self.finish(self.first_run())
+        self.assertEqual(len(journal_lines(self.journal_file)), 4)  # One record per plate
+        with open(self.output_file, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["90AA001"], POLICY)
+
+        with forbid_full_replay():
+            scraper = self.scraper()
+        self.assert_states(scraper)
+        self.assertEqual(scraper.record_count, 3)
+
+    def test_finish_below_the_ratio_does_not_compact(self):
+        self.finish(self.first_run())
+        self.assertEqual(len(journal_lines(self.journal_file)), 5)
+        self.assertFalse(os.path.exists(self.output_file))
+
+    def test_compaction_between_runs_rebuilds_the_bitmap(self):
+        self.finish(self.first_run())
+        ResultJournal(self.journal_file).compact(self.output_file)  # python -m storage.journal
+
+        scraper = self.scraper()
+        self.assert_states(scraper)
+        self.assertEqual(scraper.record_count, 3)
+
+
+class SqliteResumeTest(ResumeTestCase):
+    """The same runs over the SQLite store, which resumes from its write sequence."""
+
+    store = "sqlite"
+
+    def test_clean_stop_resumes_without_reading_the_store(self):
+        self.finish(self.first_run())
+        with forbid_store_replay():
+            scraper = self.scraper()
+        self.assert_states(scraper)
+
+    def test_crash_replays_only_the_later_upserts(self):
+        scraper = self.first_run()
+        scraper.mark_all()  # Last checkpoint before the crash
+        self.save(scraper, "90AA004", "Not Found")
+        self.save(scraper, "90AA003", POLICY, attempts=3)  # Upserts a plate written before the checkpoint
+        scraper.journal.close()
+
+        with forbid_store_replay():
+            scraper = self.scraper()
+        self.assertEqual(scraper.bitmap.get("90AA003"), STATE_FOUND)
+        self.assertEqual(scraper.bitmap.get("90AA004"), STATE_DONE)
+        self.assertEqual(scraper.failed, {})
+        self.assertEqual(dict(scraper.aggregates.counts["Error"]), {"Success": 2, "Not Found": 2})
+
+    def test_crash_tail_rescraping_an_earlier_plate_recounts_the_aggregates(self):
+        scraper = self.first_run()
+        scraper.mark_all()
+        self.save(scraper, "90AA001", "Not Found")  # Found before the checkpoint
+        scraper.journal.close()
+
+        scraper = self.scraper()
+        self.assertEqual(scraper.aggregates.plates, 3)
+        self.assertEqual(dict(scraper.aggregates.counts["Error"]), {"Not Found": 2, "Timeout": 1})
+
+    def test_failed_write_is_not_marked_done(self):
+        scraper = self.first_run()
+        with mock.patch.object(scraper.journal, "_write", side_effect=sqlite3.OperationalError("database is locked")):
+            self.save(scraper, "90AA004", "Not Found")
+            self.assertRaises(sqlite3.OperationalError, scraper.mark_all)
+        self.assertEqual(scraper.bitmap.get("90AA004"), STATE_EMPTY)
+
+    def test_replaced_store_rebuilds_the_bitmap(self):
+        self.finish(self.first_run())
+        os.remove(store_path(self.output_file))
+        scraper = self.scraper()
+        self.assertEqual(scraper.bitmap.get("90AA001"), STATE_EMPTY)
+        self.assertEqual(scraper.aggregates.plates, 0)
+
+    def test_store_without_a_write_sequence_rebuilds_the_bitmap(self):
+        self.finish(self.first_run())
+        with sqlite3.connect(store_path(self.output_file)) as db:
+            db.execute("DROP INDEX results_seq")
+            db.execute("ALTER TABLE results DROP COLUMN seq")
+        scraper = self.scraper()
+        self.assert_states(scraper)
+        self.save(scraper, "90AA004", "Not Found")
+        scraper.journal.close()
+        self.assertEqual(list(scraper.journal.replay_records())[-1]["plate"], "90AA004")
+
+
+if __name__ == "__main__":
+    unittest.main()
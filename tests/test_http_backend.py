@@ -0,0 +1,102 @@
+import asyncio
+import time
+import unittest
+
+from bench.mock_isb import MockISB
+from scraper.http_backend import HttpBackend, StaleStateError, parse_result
+
+ROW = ['"MEGA SIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ', "90AA001", "TOYOTA", "PRİUS", "Qüvvədədir"]
+POLICY = {
+    "Təşkilat": '"MEGA SIĞORTA" AÇIQ SƏHMDAR CƏMİYYƏTİ',
+    "Dövlət qeydiyyat nömrəsi": "90AA001",
+    "Marka": "TOYOTA",
+    "Model": "PRİUS",
+    "Status": "Qüvvədədir",
+}
+
+
+class FixedDataset:
+    """Policy rows per plate, [] for "No Data"; any other plate is not found."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def lookup(self, plate_number):
+        return self.rows.get(plate_number)
+
+
+DATASET = FixedDataset({
+    "90AA001": [ROW],
+    "90AA002": [ROW[:1] + ["90AA002"] + ROW[2:], ROW[:1] + ["90AA002", "KIA", "RİO", "Müddəti bitib"]],
+    "90AA003": [],
+})
+
+
+class ParseResultTest(unittest.TestCase):
+    def setUp(self):
+        self.mock = MockISB(DATASET)
+
+    def test_found(self):
+        result, parser = parse_result(self.mock.render_result("90AA001"))
+        self.assertEqual(result, POLICY)
+        self.assertIn("__VIEWSTATE", parser.fields)
+
+    def test_every_policy_is_kept(self):
+        result, _ = parse_result(self.mock.render_result("90AA002"))
+        self.assertEqual(result["Marka"], "TOYOTA")
+        self.assertEqual([policy["Marka"] for policy in result["Policies"]], ["TOYOTA", "KIA"])
+
+    def test_not_found(self):
+        self.assertEqual(parse_result(self.mock.render_result("90AA004"))[0], "Not Found")
+
+    def test_no_data(self):
+        self.assertEqual(parse_result(self.mock.render_result("90AA003"))[0], "No Data")
+
+    def test_page_without_an_answer_is_stale(self):
+        with self.assertRaises(StaleStateError):
+            parse_result(self.mock.render())
+        with self.assertRaises(StaleStateError):
+            parse_result("<h1>Validation of viewstate MAC failed.</h1>")
+
+
+class HttpBackendTest(unittest.TestCase):
+    def start(self, **options):
+        self.mock = MockISB(DATASET, **options)
+        url = self.mock.start()
+        self.addCleanup(self.mock.stop)
+        self.backend = HttpBackend(url, pool_size=1, timeout=5)
+        self.addCleanup(self.backend.close)
+
+    def lookup(self, plate_number, timeout=None):
+        return asyncio.run(self.backend.lookup(plate_number, timeout))
+
+    def test_results(self):
+        self.start()
+        self.assertEqual(self.lookup("90AA001"), POLICY)
+        self.assertEqual(self.lookup("90AA003"), "No Data")
+        self.assertEqual(self.lookup("90AA004"), "Not Found")
+        self.assertEqual(self.mock.requests - self.mock.lookups, 1)  # One form load, then postbacks only
+
+    def test_expired_state_is_reloaded(self):
+        self.start(state_ttl=0.2)
+        self.assertEqual(self.lookup("90AA004"), "Not Found")
+        time.sleep(0.3)
+        self.assertEqual(self.lookup("90AA001"), POLICY)
+        self.assertEqual(self.mock.lookups, 3)  # The rejected postback, then the retry
+        self.assertEqual(self.mock.requests - self.mock.lookups, 2)
+
+    def test_state_that_never_works_is_raised(self):
+        self.start(state_ttl=1e-6)  # Every token has expired by the time it is posted back
+        with self.assertRaises(StaleStateError):
+            self.lookup("90AA001")
+        self.assertEqual(self.mock.lookups, 2)  # Rejected, reloaded once, rejected again
+
+    def test_hung_lookup_times_out(self):
+        self.start(timeout_rate=1.0, hang_seconds=1.0)
+        started = time.monotonic()
+        self.assertEqual(self.lookup("90AA001", timeout=0.1), "Timeout")
+        self.assertLess(time.monotonic() - started, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from storage.journal import ResultJournal
+
+POLICY = {"Təşkilat": "MEGA SIĞORTA", "Marka": "TOYOTA", "Model": "PRİUS", "Status": "Qüvvədədir"}
+
+
+def journal_lines(journal_file):
+    with open(journal_file, "rb") as f:
+        return f.read().split(b"\n")
+
+
+def tear_last_record(journal_file, inside_character=False):
+    """Cuts the journal in the middle of its last record, as a crash during a write would.
+
+    With ``inside_character`` the cut splits a multi-byte UTF-8 character.
+    """
+    size = os.path.getsize(journal_file)
+    last = journal_lines(journal_file)[-2]
+    keep = len(last) // 2
+    if inside_character:
+        keep = next(index for index, byte in enumerate(last) if byte >= 0xC0) + 1
+    with open(journal_file, "r+b") as f:
+        f.truncate(size - 1 - len(last) + keep)
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_file = os.path.join(self.tmp.name, "data.json")
+        self.journal_file = os.path.join(self.tmp.name, "data.jsonl")
+
+
+class TornTailTest(JournalTestCase):
+    def test_torn_tail_is_terminated_before_new_records(self):
+        journal = ResultJournal(self.journal_file, fsync_policy="never")
+        journal.append("90AA001", "Not Found")
+        journal.append("90AA002", POLICY)
+        journal.close()
+        tear_last_record(self.journal_file)
+
+        journal = ResultJournal(self.journal_file, fsync_policy="never")
+        journal.append("90AA003", "Timeout", attempts=2)
+        journal.close()
+
+        records = list(journal.replay_records())
+        self.assertEqual([record["plate"] for record in records], ["90AA001", "90AA003"])
+        self.assertEqual(records[1]["attempts"], 2)
+        self.assertEqual(len(journal_lines(self.journal_file)), 4)  # Two records, the torn one, the final newline
+
+    def test_torn_tail_inside_a_character_is_terminated(self):
+        journal = ResultJournal(self.journal_file, fsync_policy="never")
+        journal.append("90AA001", "Not Found")
+        journal.append("90AA002", POLICY)
+        journal.close()
+        tear_last_record(self.journal_file, inside_character=True)
+
+        journal = ResultJournal(self.journal_file, fsync_policy="never")
+        journal.append("90AA003", POLICY)
+        journal.append("90AA004", "Not Found")
+        journal.close()
+
+        self.assertEqual(journal.replay(), {"90AA001": "Not Found", "90AA003": POLICY, "90AA004": "Not Found"})
+
+    def test_torn_tail_is_skipped_when_reading_backwards(self):
+        journal = ResultJournal(self.journal_file, fsync_policy="never")
+        journal.append("90AA001", "Timeout")
+        journal.append("90AA001", "Not Found")
+        journal.append("90AA002", POLICY)
+        journal.close()
+        tear_last_record(self.journal_file)
+
+        latest = list(journal.latest_records(chunk_size=16))
+        self.assertEqual(latest, [{"plate": "90AA001", "result": "Not Found"}])
+
+
+class WriteFailureTest(JournalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.journal = ResultJournal(self.journal_file, fsync_policy="always")
+        self.journal.append("90AA001", "Not Found")
+        self.journal.close()
+
+    def failing_write(self):
+        return mock.patch("storage.journal.os.fsync", side_effect=OSError(28, "No space left on device"))
+
+    def test_checkpoint_raises_and_skips_its_callback(self):
+        callback = mock.Mock()
+        with self.failing_write():
+            self.journal.append("90AA002", POLICY)
+            checkpoint = self.journal.checkpoint(callback)
+            self.assertRaises(OSError, checkpoint.result)
+        callback.assert_not_called()
+
+        # The failure is reported once; later commits reopen the journal and go through
+        self.journal.append("90AA003", "Not Found")
+        self.assertEqual(self.journal.checkpoint(callback).result(), callback.return_value)
+        self.journal.close()
+        self.assertEqual(self.journal.replay()["90AA003"], "Not Found")
+
+    def test_close_raises(self):
+        with self.failing_write():
+            self.journal.append("90AA002", POLICY)
+            self.assertRaises(OSError, self.journal.close)
+
+
+class RecordsSinceTest(JournalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.journal = ResultJournal(self.journal_file, fsync_policy="never")
+        self.journal.append("90AA001", "Not Found")
+        self.journal.close()
+        self.position = self.journal.position()
+
+    def test_returns_only_later_records(self):
+        self.journal.append("90AA002", POLICY)
+        self.journal.close()
+        self.assertEqual([record["plate"] for record in self.journal.records_since(self.position)], ["90AA002"])
+
+    def test_unchanged_journal_has_no_records(self):
+        self.assertEqual(list(self.journal.records_since(self.position)), [])
+
+    def test_compacted_journal_is_detected_by_inode(self):
+        self.journal.append("90AA001", POLICY)
+        self.journal.close()
+        self.journal.compact(self.output_file)
+        self.assertNotEqual(self.journal.position()["inode"], self.position["inode"])
+        self.assertIsNone(self.journal.records_since(self.position))
+
+    def test_truncated_journal_is_detected_by_size(self):
+        with open(self.journal_file, "r+b") as f:
+            f.truncate(self.position["size"] - 1)
+        self.assertIsNone(self.journal.records_since(self.position))
+
+    def test_other_journal_is_rejected(self):
+        other = ResultJournal(os.path.join(self.tmp.name, "other.jsonl"))
+        self.assertIsNone(other.records_since(self.position))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import json
+import unittest
+
+from scraper.metrics import Histogram, Metrics
+
+
+class HistogramTest(unittest.TestCase):
+    def test_quantile_is_a_bucket_bound(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 0.7):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.95), 1.0)
+
+    def test_quantile_past_the_last_bucket_is_the_largest_observation(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 30.25, 45.5):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.25), 0.1)
+        self.assertEqual(histogram.quantile(0.95), 45.5)
+
+    def test_snapshot_is_valid_json(self):
+        metrics = Metrics()
+        metrics.phases["plate"].observe(120.0)  # Past the last bucket
+        snapshot = json.loads(json.dumps(metrics.snapshot(), allow_nan=False))
+        self.assertEqual(snapshot["phases"]["plate"]["p95"], 120.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
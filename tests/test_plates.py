@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from scraper.plates import LETTER_PAIRS, NUMBERS_PER_BLOCK, PlateCursor, PlateSpace, normalize_plate
+
+
+class PlateSpaceTest(unittest.TestCase):
+    def setUp(self):
+        self.space = PlateSpace(["77", "90", "99"])
+
+    def test_encode_decode_round_trip(self):
+        for plate in ("77AA001", "77AA999", "90AB123", "99ZZ999", "90HJ500"):
+            self.assertEqual(self.space.decode(self.space.encode(plate)), plate)
+        for index in (0, NUMBERS_PER_BLOCK - 1, NUMBERS_PER_BLOCK, 123456, len(self.space) - 1):
+            self.assertEqual(self.space.encode(self.space.decode(index)), index)
+
+    def test_indices_follow_crawl_order(self):
+        self.assertEqual(self.space.encode("77AA001"), 0)
+        self.assertEqual(self.space.encode("77AB001"), NUMBERS_PER_BLOCK)
+        self.assertEqual(self.space.encode("90AA001"), len(LETTER_PAIRS) * NUMBERS_PER_BLOCK)
+        self.assertEqual(len(self.space), 3 * len(LETTER_PAIRS) * NUMBERS_PER_BLOCK)
+
+    def test_plates_outside_the_space_are_rejected(self):
+        for plate in ("10AA001", "90AI001", "90AA000"):
+            with self.assertRaises(ValueError):
+                self.space.encode(plate)
+
+    def test_prefixes_select_whole_blocks_or_number_ranges(self):
+        space = PlateSpace(["90"], prefixes=["90AB", "90AC12"])
+        plates = list(space.plates())
+        self.assertEqual(len(plates), NUMBERS_PER_BLOCK + 10)
+        self.assertEqual(plates[NUMBERS_PER_BLOCK:NUMBERS_PER_BLOCK + 2], ["90AC120", "90AC121"])
+
+    def test_shards_partition_the_blocks(self):
+        shards = [set(PlateSpace(["90"], shard=shard, shards=3).blocks()) for shard in range(3)]
+        self.assertEqual(set.union(*shards), set(range(len(LETTER_PAIRS))))
+        self.assertEqual(sum(len(blocks) for blocks in shards), len(LETTER_PAIRS))
+
+
+class PlateCursorTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cursor_file = os.path.join(tmp.name, "data.cursor")
+        self.space = PlateSpace(["90"], prefixes=["90AB"])
+
+    def test_resumes_where_it_stopped(self):
+        plates = list(self.space.plates())
+        PlateCursor(self.cursor_file, self.space).save(self.space.encode(plates[500]))
+
+        index = PlateCursor(self.cursor_file, PlateSpace(["90"], prefixes=["90AB"])).load()
+        self.assertEqual(list(self.space.plates(index)), plates[500:])
+
+    def test_other_space_starts_over(self):
+        PlateCursor(self.cursor_file, self.space).save(self.space.encode("90AB500"))
+        self.assertEqual(PlateCursor(self.cursor_file, PlateSpace(["90"], prefixes=["90AC"])).load(), 0)
+
+    def test_missing_or_corrupt_cursor_starts_over(self):
+        cursor = PlateCursor(self.cursor_file, self.space)
+        self.assertEqual(cursor.load(), 0)
+        with open(self.cursor_file, "w", encoding="utf-8") as f:
+            f.write('{"space": ')
+        self.assertEqual(cursor.load(), 0)
+
+
+class NormalizePlateTest(unittest.TestCase):
+    def test_loose_input_is_normalized(self):
+        self.assertEqual(normalize_plate("90AB123"), "90AB123")
+        self.assertEqual(normalize_plate("90-ab 123"), "90AB123")
+        self.assertEqual(normalize_plate(" 77 zz-001 "), "77ZZ001")
+
+    def test_non_plates_are_rejected(self):
+        for text in ("90AB000", "90AI123", "90AB12", "9AB123", "90AB1234", "90A1123", ""):
+            self.assertIsNone(normalize_plate(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from storage.sqlite_store import SqliteStore
+
+POLICY = {"Təşkilat": "MEGA SIĞORTA", "Marka": "TOYOTA", "Model": "PRİUS", "Status": "Qüvvədədir"}
+
+
+class WriteFailureTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = SqliteStore(os.path.join(tmp.name, "data.sqlite"))
+        self.store.append("90AA001", "Not Found")
+        self.store.close()
+
+    def fail_inserts(self):
+        with sqlite3.connect(self.store.db_file) as db:
+            db.execute("CREATE TRIGGER full BEFORE INSERT ON results BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+
+    def allow_inserts(self):
+        with sqlite3.connect(self.store.db_file) as db:
+            db.execute("DROP TRIGGER full")
+
+    def test_checkpoint_raises_and_skips_its_callback(self):
+        callback = mock.Mock()
+        self.fail_inserts()
+        self.store.append("90AA002", POLICY)
+        self.assertRaises(sqlite3.IntegrityError, self.store.checkpoint(callback).result)
+        callback.assert_not_called()
+
+        # The failure is reported once; later batches reconnect and go through
+        self.allow_inserts()
+        self.store.append("90AA003", "Not Found")
+        self.assertEqual(self.store.checkpoint(callback).result(), callback.return_value)
+        self.store.close()
+        self.assertEqual(self.store.replay(), {"90AA001": "Not Found", "90AA003": "Not Found"})
+
+    def test_close_raises(self):
+        self.fail_inserts()
+        self.store.append("90AA002", POLICY)
+        self.assertRaises(sqlite3.IntegrityError, self.store.close)
+
+
+if __name__ == "__main__":
+    unittest.main()